@@ -4,8 +4,11 @@ LLM驱动的智能数据洞察生成器
 基于实际查询结果数据进行LLM分析，生成真正智能的业务洞察
 """
 
+import hashlib
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
@@ -16,6 +19,39 @@ try:
 except ImportError:
     LLM_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(obj: Any, indent: bool = False) -> str:
+    """序列化为JSON文本（优先使用orjson，不可用或无法序列化时回退到json）"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+# 批量洞察生成时并发调用LLM的最大线程数
+_LLM_BATCH_MAX_WORKERS = 4
+
+# 智能内容提取所用关键词：银行业务关键词 → 洞察，行动关键词 → 建议
+_BANKING_KEYWORDS = ['贷款', '客户', '风险', '余额', '银行', '资产', '不良', '支行', '存款']
+_ACTIONABLE_KEYWORDS = ['建议', '应该', '需要', '立即', '加强', '优化', '建立']
+
+# 两组关键词合并为一个正则，单次扫描即可按命名分组区分命中类别
+_INTELLIGENT_KEYWORD_PATTERN = re.compile(
+    '(?P<insight>' + '|'.join(map(re.escape, _BANKING_KEYWORDS)) + ')'
+    '|(?P<rec>' + '|'.join(map(re.escape, _ACTIONABLE_KEYWORDS)) + ')'
+)
+
 
 class LLMInsightsGenerator:
     """
@@ -100,6 +136,62 @@ class LLMInsightsGenerator:
             # 不使用硬编码回退，直接抛出异常
             raise Exception(f"智能洞察生成失败: {e}")
     
+    def generate_intelligent_insights_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量生成基于LLM的智能数据洞察
+
+        同一批次内提示词完全相同的请求只调用一次LLM，结果按原顺序分发。
+
+        Args:
+            items: 请求列表，每项包含query, data_tables以及可选的sql_query, analysis_context
+
+        Returns:
+            List[Dict]: 与items顺序一致的洞察结果列表
+        """
+        try:
+            print(f"[DEBUG] LLMInsightsGenerator: 开始批量生成智能洞察，请求数: {len(items)}")
+
+            if not self.llm_client:
+                raise Exception("LLM客户端未初始化，无法生成智能洞察")
+
+            for item in items:
+                if not item.get('data_tables'):
+                    raise Exception("查询未返回数据，无法生成洞察分析")
+
+            # 构建提示词并按内容摘要去重
+            prompts = [
+                self._build_insights_prompt(
+                    item['query'],
+                    item['data_tables'],
+                    item.get('sql_query'),
+                    item.get('analysis_context')
+                )
+                for item in items
+            ]
+            digests = [hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).digest() for prompt in prompts]
+            unique_prompts = dict(zip(digests, prompts))
+            print(f"[DEBUG] LLMInsightsGenerator: 去重后LLM调用数: {len(unique_prompts)}")
+
+            # 在线程池中并发调用LLM，仅针对去重后的提示词（不依赖事件循环，可在异步环境中调用）
+            if not unique_prompts:
+                return []
+            with ThreadPoolExecutor(max_workers=min(len(unique_prompts), _LLM_BATCH_MAX_WORKERS)) as pool:
+                responses = list(pool.map(self._call_llm, unique_prompts.values()))
+            responses_by_digest = dict(zip(unique_prompts.keys(), responses))
+
+            # 按原顺序解析和验证
+            results = []
+            for item, digest in zip(items, digests):
+                insights = self._parse_llm_insights(responses_by_digest[digest])
+                results.append(self._validate_insights_structure(insights, item['query'], item['data_tables']))
+
+            print(f"[DEBUG] LLMInsightsGenerator: 批量洞察生成完成")
+            return results
+
+        except Exception as e:
+            print(f"[ERROR] LLMInsightsGenerator: 批量洞察生成失败: {e}")
+            raise Exception(f"智能洞察生成失败: {e}")
+
     def _build_insights_prompt(self, 
                               query: str, 
                               data_tables: Dict[str, List[Dict]], 
@@ -113,7 +205,7 @@ class LLMInsightsGenerator:
         # 构建上下文信息
         context_info = ""
         if analysis_context:
-            context_info = f"\n## 分析上下文\n{json.dumps(analysis_context, ensure_ascii=False, indent=2)}"
+            context_info = f"\n## 分析上下文\n{_dumps(analysis_context, indent=True)}"
         
         sql_info = ""
         if sql_query:
@@ -202,7 +294,7 @@ class LLMInsightsGenerator:
             sample_data = table_data[:3]
             summary_parts.append("数据样本:")
             for i, record in enumerate(sample_data, 1):
-                summary_parts.append(f"记录{i}: {json.dumps(record, ensure_ascii=False)}")
+                summary_parts.append(f"记录{i}: {_dumps(record)}")
             
             if record_count > 3:
                 summary_parts.append(f"... 还有 {record_count - 3} 条记录")
@@ -347,7 +439,27 @@ class LLMInsightsGenerator:
         """从文本响应中解析洞察内容（增强版）"""
         print(f"[DEBUG] LLMInsightsGenerator: 开始文本解析，响应长度: {len(text_response)}")
 
-        insights = {
+        # 尝试多种解析策略，每个策略使用独立的结果字典，只有验证通过才采用
+        strategies = [
+            (self._parse_by_keywords, '关键词解析'),        # 策略1: 基于关键词的段落解析
+            (self._parse_structured_text, '结构化解析'),    # 策略2: 基于结构化文本解析
+            (self._extract_content_intelligently, '智能提取'),  # 策略3: 智能内容提取
+        ]
+
+        insights = None
+        for strategy, strategy_name in strategies:
+            insights = strategy(text_response, self._empty_insights())
+            if self._validate_insights_basic(insights):
+                print(f"[DEBUG] LLMInsightsGenerator: {strategy_name}成功")
+                return insights
+
+        print(f"[WARNING] LLMInsightsGenerator: 所有文本解析策略都失败")
+        return insights
+
+    @staticmethod
+    def _empty_insights() -> Dict[str, Any]:
+        """创建空的洞察结果结构"""
+        return {
             'summary': '',
             'key_insights': [],
             'trends': [],
@@ -355,29 +467,6 @@ class LLMInsightsGenerator:
             'recommendations': []
         }
 
-        # 尝试多种解析策略
-
-        # 策略1: 基于关键词的段落解析
-        insights = self._parse_by_keywords(text_response, insights)
-        if self._validate_insights_basic(insights):
-            print(f"[DEBUG] LLMInsightsGenerator: 关键词解析成功")
-            return insights
-
-        # 策略2: 基于结构化文本解析
-        insights = self._parse_structured_text(text_response, insights)
-        if self._validate_insights_basic(insights):
-            print(f"[DEBUG] LLMInsightsGenerator: 结构化解析成功")
-            return insights
-
-        # 策略3: 智能内容提取
-        insights = self._extract_content_intelligently(text_response, insights)
-        if self._validate_insights_basic(insights):
-            print(f"[DEBUG] LLMInsightsGenerator: 智能提取成功")
-            return insights
-
-        print(f"[WARNING] LLMInsightsGenerator: 所有文本解析策略都失败")
-        return insights
-
     def _parse_by_keywords(self, text_response: str, insights: Dict[str, Any]) -> Dict[str, Any]:
         """基于关键词的解析策略"""
         lines = text_response.split('\n')
@@ -461,23 +550,23 @@ class LLMInsightsGenerator:
             if line and len(line) > 20:
                 sentences.extend([s.strip() for s in line.split('。') if s.strip()])
 
-        banking_keywords = ['贷款', '客户', '风险', '余额', '银行', '资产', '不良', '支行', '存款']
-        actionable_keywords = ['建议', '应该', '需要', '立即', '加强', '优化', '建立']
-
-        # 提取包含银行关键词的句子作为洞察
+        # 单次遍历句子，同时路由到洞察和建议
         for sentence in sentences:
-            if any(keyword in sentence for keyword in banking_keywords):
-                if len(sentence) > 15 and len(sentence) < 200:
-                    if not insights['summary'] and len(sentence) > 30:
-                        insights['summary'] = sentence + '。'
-                    elif len(insights['key_insights']) < 3:
-                        insights['key_insights'].append(sentence + '。')
-
-        # 提取包含行动关键词的句子作为建议
-        for sentence in sentences:
-            if any(keyword in sentence for keyword in actionable_keywords):
-                if len(sentence) > 15 and len(sentence) < 200:
-                    insights['recommendations'].append(sentence + '。')
+            if not 15 < len(sentence) < 200:
+                continue
+
+            hits = {match.lastgroup for match in _INTELLIGENT_KEYWORD_PATTERN.finditer(sentence)}
+
+            # 包含银行关键词的句子作为洞察
+            if 'insight' in hits:
+                if not insights['summary'] and len(sentence) > 30:
+                    insights['summary'] = sentence + '。'
+                elif len(insights['key_insights']) < 3:
+                    insights['key_insights'].append(sentence + '。')
+
+            # 包含行动关键词的句子作为建议
+            if 'rec' in hits:
+                insights['recommendations'].append(sentence + '。')
 
         return insights
 
@@ -526,13 +615,7 @@ class LLMInsightsGenerator:
 
     def _validate_insights_structure(self, insights: Dict[str, Any], query: str, data_tables: Dict[str, List[Dict]]) -> Dict[str, Any]:
         """验证洞察结构，确保API兼容性 - 移除所有硬编码默认值"""
-        validated = {
-            'summary': '',
-            'key_insights': [],
-            'trends': [],
-            'anomalies': [],
-            'recommendations': []
-        }
+        validated = self._empty_insights()
 
         # 严格验证summary - 必须由LLM生成
         if not insights.get('summary'):
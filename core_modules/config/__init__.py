@@ -13,30 +13,12 @@ DataProxy 配置管理模块 - 重构后的简化配置系统
 - 统一管理：避免配置冲突
 """
 
-# 简化后的配置组件
-try:
-    from .database_config_manager import DatabaseConfigManager, get_database_config
-
-    # 向后兼容接口
-    from .unified_config import UnifiedConfig, get_unified_config, reset_unified_config
-
-    # 添加兼容性函数
-    def get_configuration_registry():
-        """兼容性函数 - 返回配置注册表对象"""
-        class ConfigurationRegistry:
-            def __init__(self):
-                self.database_config = get_database_config()
-                self.unified_config = get_unified_config()
-
-            def get_nl2sql_config(self):
-                """获取NL2SQL配置"""
-                if hasattr(self.unified_config, 'nl2sql_config'):
-                    return self.unified_config.nl2sql_config
-                else:
-                    # 返回默认配置
-                    return {
-                        'prompt_templates': {
-                            'simple_query': '''你是一个专业的银行数据分析师，需要将自然语言查询转换为准确的SQL语句。
+import importlib
+from functools import lru_cache
+from types import MappingProxyType
+
+# 默认NL2SQL提示词模板
+_SIMPLE_QUERY_TEMPLATE = '''你是一个专业的银行数据分析师，需要将自然语言查询转换为准确的SQL语句。
 
 数据库结构：
 {schema_info}
@@ -56,8 +38,9 @@ try:
 4. 确保SQL语法正确
 5. 如果需要计算，使用适当的聚合函数
 
-SQL语句：''',
-                            'complex_query': '''你是一个专业的银行数据分析师，需要将复杂的自然语言查询转换为准确的SQL语句。
+SQL语句：'''
+
+_COMPLEX_QUERY_TEMPLATE = '''你是一个专业的银行数据分析师，需要将复杂的自然语言查询转换为准确的SQL语句。
 
 数据库结构：
 {schema_info}
@@ -79,53 +62,113 @@ SQL语句：''',
 6. 确保SQL语法正确
 
 SQL语句：'''
-                        },
-                        'query_modes': ['simple', 'complex', 'analytical'],
-                        'constraints': [
-                            '只返回SQL语句，不要包含解释',
-                            '使用标准SQL语法',
-                            '确保字段名正确',
-                            '添加适当的WHERE条件',
-                            '限制结果数量以提高性能'
-                        ]
-                    }
-
-        return ConfigurationRegistry()
-
-    def get_context_manager():
-        """返回真正的统一配置管理器"""
-        return get_unified_config()
-
-    __all__ = [
-        # 简化后组件
-        'DatabaseConfigManager',
-        'get_database_config',
-
-        # 向后兼容
-        'UnifiedConfig',
-        'get_unified_config',
-        'reset_unified_config',
-
-        # 兼容性函数
-        'get_configuration_registry',
-        'get_context_manager'
-    ]
-
-    print("✅ 配置管理模块: 简化后组件加载成功")
-    print("ℹ️  Config: ContextManager和ConfigurationRegistry已被CoreDataEngine替代")
-
-except ImportError as e:
-    print(f"⚠️ 配置管理模块: 部分组件加载失败 - {e}")
-
-    # 回退到原有组件
-    try:
-        from .unified_config import UnifiedConfig, get_unified_config, reset_unified_config
-
-        __all__ = [
-            'UnifiedConfig', 'get_unified_config', 'reset_unified_config'
-        ]
-        print("✅ 配置管理模块: 使用原有组件")
-
-    except ImportError as fallback_e:
-        print(f"❌ 配置管理模块: 完全加载失败 - {fallback_e}")
-        __all__ = []
+
+# 默认NL2SQL配置（模块加载时构建一次，嵌套结构同样只读，所有调用方共享同一实例）
+_DEFAULT_NL2SQL_CONFIG = MappingProxyType({
+    'prompt_templates': MappingProxyType({
+        'simple_query': _SIMPLE_QUERY_TEMPLATE,
+        'complex_query': _COMPLEX_QUERY_TEMPLATE
+    }),
+    'query_modes': ('simple', 'complex', 'analytical'),
+    'constraints': (
+        '只返回SQL语句，不要包含解释',
+        '使用标准SQL语法',
+        '确保字段名正确',
+        '添加适当的WHERE条件',
+        '限制结果数量以提高性能'
+    )
+})
+
+
+class _ConfigurationRegistry:
+    """兼容性配置注册表"""
+
+    def __init__(self):
+        from .database_config_manager import get_database_config
+        from .unified_config import get_unified_config
+
+        self.database_config = get_database_config()
+        self.unified_config = get_unified_config()
+
+    def get_nl2sql_config(self):
+        """获取NL2SQL配置"""
+        if hasattr(self.unified_config, 'nl2sql_config'):
+            return self.unified_config.nl2sql_config
+        else:
+            # 返回默认配置
+            return _DEFAULT_NL2SQL_CONFIG
+
+
+# 兼容性函数
+@lru_cache(maxsize=1)
+def get_configuration_registry():
+    """兼容性函数 - 返回配置注册表对象"""
+    return _ConfigurationRegistry()
+
+
+def get_context_manager():
+    """返回真正的统一配置管理器（每次调用都取当前全局实例，重载或重置后不会返回已关闭的旧实例）"""
+    from .unified_config import get_unified_config
+
+    return get_unified_config()
+
+
+def reset_config_registry():
+    """清除兼容性函数缓存的单例"""
+    get_configuration_registry.cache_clear()
+
+
+def reset_unified_config():
+    """重置统一配置，并同步清除兼容性单例"""
+    from .unified_config import reset_unified_config as _reset_unified_config
+
+    _reset_unified_config()
+    reset_config_registry()
+
+
+def reset_database_config():
+    """重置数据库配置管理器，并同步清除兼容性单例"""
+    from .database_config_manager import reset_database_config as _reset_database_config
+
+    _reset_database_config()
+    reset_config_registry()
+
+
+# 子模块中的组件在首次访问时才导入（PEP 562），导入本包不会加载数据库或配置代码
+_LAZY_EXPORTS = {
+    # 简化后组件
+    'DatabaseConfigManager': 'database_config_manager',
+    'get_database_config': 'database_config_manager',
+
+    # 向后兼容
+    'UnifiedConfig': 'unified_config',
+    'get_unified_config': 'unified_config',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = [
+    # 简化后组件
+    'DatabaseConfigManager',
+    'get_database_config',
+    'reset_database_config',
+
+    # 向后兼容
+    'UnifiedConfig',
+    'get_unified_config',
+    'reset_unified_config',
+
+    # 兼容性函数
+    'get_configuration_registry',
+    'get_context_manager',
+    'reset_config_registry'
+]
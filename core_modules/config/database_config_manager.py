@@ -8,21 +8,53 @@
 import os
 import json
 import hashlib
+import logging
 import sqlite3
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, asdict
+from functools import lru_cache
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# 表清单查询：优先使用PRAGMA table_list（SQLite 3.37+），旧版本返回空结果时回退到sqlite_master
+_TABLE_LIST_PRAGMA = "PRAGMA table_list"
+_TABLE_LIST_QUERY = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+_PROBE_TABLE_LIST_QUERY = "SELECT name FROM probe.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+
+# is_valid中文件存在性检查的缓存时长（秒）
+_EXISTS_CHECK_TTL = 1.0
+
+# 识别为数据库文件的扩展名
+_DB_SUFFIXES = frozenset({'.db', '.sqlite', '.sqlite3'})
+
+# 数据库搜索目录（可通过DATAPROXY_DB_PATHS环境变量覆盖，以os.pathsep分隔）
+_DEFAULT_DB_SEARCH_PATHS = os.pathsep.join([".", "flask_backend"])
+
+# 数据库发现缓存: 搜索目录 -> (目录mtime, 发现的数据库列表)
+_discovery_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+
+@lru_cache(maxsize=128)
+def _db_stem(database_path: str) -> str:
+    """数据库文件名（不含目录和扩展名）"""
+    return os.path.splitext(os.path.basename(database_path))[0]
+
+
+
+@dataclass(frozen=True)
 class DatabaseInfo:
-    """数据库信息"""
+    """数据库信息（不可变，缓存中的实例在调用方之间共享，字段均为不可变类型）"""
+    __slots__ = ('path', 'name', 'type', 'description', 'tables', 'config_file')
+
     path: str
     name: str
     type: str
     description: str
-    tables: List[str]
-    config_file: Optional[str] = None
+    tables: Tuple[str, ...]
+    config_file: Optional[str]
 
 
 class DatabaseConfigManager:
@@ -34,34 +66,65 @@ class DatabaseConfigManager:
     2. 加载和保存数据库配置
     3. 提供数据库基础信息
     """
+
+    # 配置目录是否已创建（进程级标记，避免重复mkdir）
+    _config_dir_ready = False
     
     def __init__(self):
         self.current_database: Optional[str] = None
         self.database_info: Optional[DatabaseInfo] = None
         self.config_dir = Path("configs/database_contexts")
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 发现可用数据库
-        self.available_databases = self._discover_databases()
-        
-        # 自动选择数据库（如果只有一个）
-        if len(self.available_databases) == 1:
-            self.switch_database(self.available_databases[0])
+        self._config_path_cache: Dict[str, str] = {}
+        self._conn_cache: Dict[str, sqlite3.Connection] = {}
+        self._info_cache: Dict[Tuple[str, int, int], DatabaseInfo] = {}
+        self._last_exists_check: Tuple[float, Optional[str], bool] = (0.0, None, False)
+
+        # 可用数据库在首次访问时才发现（延迟初始化）
+        self._available_databases: Optional[List[str]] = None
+
+    @property
+    def available_databases(self) -> List[str]:
+        """可用数据库列表（首次访问时发现）"""
+        return self.get_available_databases()
+
+    def _maybe_autoselect(self):
+        """自动选择数据库（如果只有一个且尚未选择）"""
+        if self.current_database is None and len(self._available_databases) == 1:
+            self.switch_database(self._available_databases[0])
     
     def _discover_databases(self) -> List[str]:
         """发现可用的数据库文件"""
         databases = []
         
-        # 在当前目录和flask_backend目录中查找.db文件
-        search_paths = [".", "flask_backend"]
+        # 默认在当前目录和flask_backend目录中查找数据库文件
+        search_paths = os.environ.get('DATAPROXY_DB_PATHS', _DEFAULT_DB_SEARCH_PATHS).split(os.pathsep)
         
         for search_path in search_paths:
-            if os.path.exists(search_path):
-                for file in os.listdir(search_path):
-                    if file.endswith('.db'):
-                        db_path = os.path.join(search_path, file)
-                        if os.path.isfile(db_path):
-                            databases.append(db_path)
+            try:
+                mtime = os.stat(search_path).st_mtime
+            except FileNotFoundError:
+                continue
+
+            # 目录mtime未变化时直接复用上次的扫描结果
+            cached = _discovery_cache.get(search_path)
+            if cached is not None and cached[0] == mtime:
+                databases.extend(cached[1])
+                continue
+
+            # scandir直接返回目录项类型信息，无需逐个文件stat
+            found = []
+            try:
+                with os.scandir(search_path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        dot = name.rfind('.')
+                        if dot != -1 and name[dot:] in _DB_SUFFIXES and entry.is_file():
+                            found.append(entry.path)
+            except FileNotFoundError:
+                continue
+
+            _discovery_cache[search_path] = (mtime, found)
+            databases.extend(found)
         
         return databases
     
@@ -77,7 +140,7 @@ class DatabaseConfigManager:
         """
         try:
             if not os.path.exists(database_path):
-                print(f"[ERROR] 数据库文件不存在: {database_path}")
+                logger.error("数据库文件不存在: %s", database_path)
                 return False
             
             # 获取数据库基础信息
@@ -86,85 +149,220 @@ class DatabaseConfigManager:
             if db_info:
                 self.current_database = database_path
                 self.database_info = db_info
-                print(f"[INFO] 数据库切换成功: {database_path}")
+                logger.info("数据库切换成功: %s", database_path)
                 return True
             else:
-                print(f"[ERROR] 无法获取数据库信息: {database_path}")
+                logger.error("无法获取数据库信息: %s", database_path)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] 数据库切换失败: {e}")
+            logger.error("数据库切换失败: %s", e)
             return False
     
     def _get_database_info(self, database_path: str) -> Optional[DatabaseInfo]:
         """获取数据库基础信息"""
         try:
-            # 连接数据库获取表信息
-            conn = sqlite3.connect(database_path)
-            cursor = conn.cursor()
-            
-            # 获取所有表名
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            conn.close()
-            
-            # 生成数据库信息
-            db_name = os.path.splitext(os.path.basename(database_path))[0]
-            
-            return DatabaseInfo(
-                path=database_path,
-                name=db_name,
-                type="sqlite",
-                description=f"SQLite数据库: {db_name}",
-                tables=tables,
-                config_file=self._get_config_file_path(database_path)
-            )
+            # 文件未变化（mtime和大小一致）时直接返回缓存的信息
+            stat = os.stat(database_path)
+            cache_key = (database_path, stat.st_mtime_ns, stat.st_size)
+            cached_info = self._info_cache.get(cache_key)
+            if cached_info is not None:
+                return cached_info
+
+            # 内存未命中时尝试磁盘元数据缓存，仍未命中才查询数据库
+            db_info = self._load_meta_cache(database_path, stat)
+            if db_info is None:
+                db_info = self._build_database_info(database_path, self._query_tables(database_path))
+                self._save_meta_cache(database_path, stat, db_info)
+
+            self._info_cache[cache_key] = db_info
+            return db_info
             
         except Exception as e:
-            print(f"[ERROR] 获取数据库信息失败: {e}")
+            logger.error("获取数据库信息失败: %s", e)
             return None
-    
+
+    def _build_database_info(self, database_path: str, tables: List[str]) -> DatabaseInfo:
+        """生成数据库信息"""
+        db_name = _db_stem(database_path)
+
+        return DatabaseInfo(
+            path=database_path,
+            name=db_name,
+            type="sqlite",
+            description=f"SQLite数据库: {db_name}",
+            tables=tuple(tables),
+            config_file=self._get_config_file_path(database_path)
+        )
+
+    def _prewarm(self, database_paths: List[str]):
+        """预热数据库信息缓存：用一个内存连接依次ATTACH各数据库读取表清单"""
+        conn = None
+        try:
+            for database_path in database_paths:
+                try:
+                    stat = os.stat(database_path)
+                    cache_key = (database_path, stat.st_mtime_ns, stat.st_size)
+                    if cache_key in self._info_cache:
+                        continue
+
+                    db_info = self._load_meta_cache(database_path, stat)
+                    if db_info is None:
+                        if conn is None:
+                            conn = sqlite3.connect(':memory:')
+                        conn.execute("ATTACH DATABASE ? AS probe", (database_path,))
+                        try:
+                            tables = [row[0] for row in conn.execute(_PROBE_TABLE_LIST_QUERY).fetchall()]
+                        finally:
+                            conn.execute("DETACH DATABASE probe")
+                        db_info = self._build_database_info(database_path, tables)
+                        self._save_meta_cache(database_path, stat, db_info)
+
+                    self._info_cache[cache_key] = db_info
+                except Exception as e:
+                    logger.warning("预热数据库信息失败: %s: %s", database_path, e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _query_tables(self, database_path: str) -> List[str]:
+        """查询数据库中的所有表名"""
+        # 复用已打开的连接获取表信息
+        conn = self._get_connection(database_path)
+
+        rows = conn.execute(_TABLE_LIST_PRAGMA).fetchall()
+        if rows:
+            # 列顺序: schema, name, type, ncol, wr, strict
+            return [
+                name for schema, name, table_type, *_ in rows
+                if schema == 'main' and table_type == 'table' and not name.startswith('sqlite_')
+            ]
+        return [row[0] for row in conn.execute(_TABLE_LIST_QUERY).fetchall()]
+
+    def _get_meta_cache_path(self, database_path: str) -> str:
+        """生成数据库元数据缓存文件路径"""
+        return self._get_config_file_path(database_path)[:-len('.json')] + '.meta.json'
+
+    def _load_meta_cache(self, database_path: str, stat: os.stat_result) -> Optional[DatabaseInfo]:
+        """读取磁盘元数据缓存（文件mtime和大小一致时有效）"""
+        try:
+            with open(self._get_meta_cache_path(database_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data['mtime_ns'] == stat.st_mtime_ns and data['size'] == stat.st_size:
+                info = data['info']
+                info['tables'] = tuple(info['tables'])
+                return DatabaseInfo(**info)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _save_meta_cache(self, database_path: str, stat: os.stat_result, db_info: DatabaseInfo):
+        """原子写入磁盘元数据缓存"""
+        cache_path = self._get_meta_cache_path(database_path)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'info': asdict(db_info)
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("写入数据库元数据缓存失败: %s", e)
+
+    def _get_connection(self, database_path: str) -> sqlite3.Connection:
+        """获取数据库连接（按路径缓存复用，只读元数据）"""
+        conn = self._conn_cache.get(database_path)
+        if conn is None:
+            conn = sqlite3.connect(database_path, check_same_thread=False)
+            conn.execute("PRAGMA query_only=1")
+            self._conn_cache[database_path] = conn
+        return conn
+
+    def close(self):
+        """关闭所有缓存的数据库连接"""
+        for conn in self._conn_cache.values():
+            conn.close()
+        self._conn_cache.clear()
+
+    def _ensure_config_dir(self):
+        """确保配置目录存在（进程内只创建一次）"""
+        if not DatabaseConfigManager._config_dir_ready:
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            DatabaseConfigManager._config_dir_ready = True
+
     def _get_config_file_path(self, database_path: str) -> str:
         """生成配置文件路径"""
-        db_name = os.path.splitext(os.path.basename(database_path))[0]
-        db_hash = hashlib.md5(database_path.encode()).hexdigest()
-        return str(self.config_dir / f"{db_name}_{db_hash}.json")
+        config_path = self._config_path_cache.get(database_path)
+        if config_path is not None:
+            return config_path
+
+        db_name = _db_stem(database_path)
+        self._ensure_config_dir()
+        # 哈希仅用于区分同名数据库，无需密码学强度
+        db_hash = hashlib.blake2b(database_path.encode('utf-8'), digest_size=8).hexdigest()
+        config_path = str(self.config_dir / f"{db_name}_{db_hash}.json")
+        self._config_path_cache[database_path] = config_path
+        return config_path
     
     def get_current_database(self) -> Optional[str]:
         """获取当前数据库路径"""
+        self.get_available_databases()
         return self.current_database
     
     def get_database_info(self) -> Optional[DatabaseInfo]:
         """获取当前数据库信息"""
+        self.get_available_databases()
         return self.database_info
     
     def get_available_databases(self) -> List[str]:
         """获取可用数据库列表"""
-        return self.available_databases
+        if self._available_databases is None:
+            self._available_databases = self._discover_databases()
+            self._prewarm(self._available_databases)
+            self._maybe_autoselect()
+        return self._available_databases
     
     def is_valid(self) -> bool:
         """检查配置是否有效"""
+        self.get_available_databases()
+        # 先做廉价的None检查，最后才检查文件是否存在
         return (
             self.current_database is not None and
-            os.path.exists(self.current_database) and
-            self.database_info is not None
+            self.database_info is not None and
+            self._database_exists()
         )
 
+    def _database_exists(self) -> bool:
+        """检查当前数据库文件是否存在（结果缓存1秒，避免热路径上的重复stat）"""
+        now = time.monotonic()
+        checked_at, path, exists = self._last_exists_check
+        if path != self.current_database or now - checked_at >= _EXISTS_CHECK_TTL:
+            exists = os.path.exists(self.current_database)
+            self._last_exists_check = (now, self.current_database, exists)
+        return exists
+
 
 # 全局实例
 _database_config_manager = None
+_database_config_lock = threading.Lock()
 
 
 def get_database_config() -> DatabaseConfigManager:
-    """获取数据库配置管理器实例"""
+    """获取数据库配置管理器实例（线程安全，双重检查锁定）"""
     global _database_config_manager
     if _database_config_manager is None:
-        _database_config_manager = DatabaseConfigManager()
+        with _database_config_lock:
+            if _database_config_manager is None:
+                _database_config_manager = DatabaseConfigManager()
     return _database_config_manager
 
 
 def reset_database_config():
     """重置数据库配置管理器"""
     global _database_config_manager
-    _database_config_manager = None
+    with _database_config_lock:
+        if _database_config_manager is not None:
+            _database_config_manager.close()
+        _database_config_manager = None
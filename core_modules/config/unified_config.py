@@ -6,136 +6,75 @@
 
 import os
 import json
-from dataclasses import dataclass
-from typing import Dict, Any, List, Optional
+import hashlib
+import itertools
+import logging
+import mmap
+import re
+import sqlite3
+import stat
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 # 定义本地的数据类
-from dataclasses import dataclass
-
-@dataclass
-class BusinessTerm:
-    """业务术语定义"""
-    name: str
-    definition: str
-    data_representation: str
-    sql_conditions: str
-    examples: List[str]
-
-@dataclass
-class QueryScope:
-    """查询范围规则"""
-    query_pattern: str
-    scope_type: str  # 'all', 'filtered', 'specific'
-    filter_conditions: str
-    description: str
-
-
-@dataclass
-class QueryContext:
-    """统一的查询上下文 - 包含查询执行所需的所有信息"""
-    user_query: str
-    database_path: str
-    database_type: str
-    business_terms: Dict[str, BusinessTerm]
-    schema_info: Dict[str, Any]
-    query_scope_rules: List[QueryScope]
-    table_relationships: Dict[str, Any] = None
-
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式，用于传递给SQL引擎"""
-        # 转换业务术语为字典格式
-        business_terms_dict = {}
-        for term_name, term in self.business_terms.items():
-            if hasattr(term, 'definition'):
-                business_terms_dict[term_name] = {
-                    'name': term.name,
-                    'definition': term.definition,
-                    'sql_conditions': term.sql_conditions
-                }
-            else:
-                business_terms_dict[term_name] = term
-
-        # 转换schema信息为简化格式
-        tables = []
-        table_details = {}
-        for table_name, table_info in self.schema_info.items():
-            if table_name not in ['description', 'database_type', 'total_tables']:
-                tables.append(table_name)
-                if isinstance(table_info, dict):
-                    columns = table_info.get('columns', [])
-                    if isinstance(columns, list) and columns:
-                        if isinstance(columns[0], dict):
-                            # 如果是字典格式，提取列名
-                            column_names = [col.get('name', str(col)) for col in columns]
-                        else:
-                            # 如果是字符串格式，直接使用
-                            column_names = [str(col) for col in columns]
-                    else:
-                        column_names = []
-
-                    table_details[table_name] = {
-                        'columns': column_names,
-                        'row_count': table_info.get('row_count', 0)
-                    }
-
-        return {
-            'user_query': self.user_query,
-            'database_path': self.database_path,
-            'database_type': self.database_type,
-            'business_terms': business_terms_dict,
-            'tables': tables,
-            'table_details': table_details,
-            'schema_info': self.schema_info,
-            'query_scope_rules': [
-                {
-                    'query_pattern': rule.query_pattern,
-                    'scope_type': rule.scope_type,
-                    'filter_conditions': rule.filter_conditions,
-                    'description': rule.description
-                } for rule in self.query_scope_rules
-            ],
-            'table_relationships': self.table_relationships or {}
-        }
-
-    def to_full_prompt(self) -> str:
-        """生成包含所有上下文的完整提示词"""
-        # 🚀 修复：只包含查询中明确提到的业务术语
-        terms_text = ""
-        for term_name, term in self.business_terms.items():
-            # 检查查询中是否明确提到了这个术语
-            if (term_name in self.user_query or
-                term.name in self.user_query or
-                any(keyword in self.user_query for keyword in term.name.split())):
-                terms_text += f"- {term.name}：{term.definition}\n"
-                terms_text += f"  数据表示：{term.data_representation}\n"
-        
-        # 格式化查询范围规则
-        rules_text = ""
-        for rule in self.query_scope_rules:
-            rules_text += f"- {rule.description}\n"
-            rules_text += f"  筛选条件：{rule.filter_conditions}\n"
-
-        # 构建表关系信息
-        schema_summary = ""
-        if self.table_relationships:
-            schema_summary = "【重要：表关系和 JOIN 条件】\n"
-            schema_summary += "生成 SQL 时必须严格按照以下 JOIN 条件：\n"
-            for rel_name, rel_info in self.table_relationships.items():
-                from_table = rel_info.get('from_table', '')
-                to_table = rel_info.get('to_table', '')
-                from_field = rel_info.get('from_field', '')
-                to_field = rel_info.get('to_field', '')
-                schema_summary += f"- {from_table}.{from_field} = {to_table}.{to_field}\n"
-
-            schema_summary += "\n⚠️ 注意：字段名包含中文，请使用准确的字段名：\n"
-            schema_summary += "- CORP_LOAN_CONTRACT_INFO 表的客户字段是：客户编号\n"
-            schema_summary += "- CORP_LOAN_CONTRACT_INFO 表的合同字段是：合同编号\n"
-            schema_summary += "- CONT_RACTCLASSIFY 表的合同字段是：CONTRACT_NO\n"
-
-        # 添加通用数据库指导
-        general_guidance = f"""
+from dataclasses import dataclass, field
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 配置版本号：每次配置加载或数据库切换都会分配新的全局唯一版本号
+_config_versions = itertools.count(1)
+
+# SQLite Schema磁盘缓存目录（按数据库文件mtime和大小失效）
+_SCHEMA_CACHE_DIR = ".dp_cache"
+
+# 一次性取回所有用户表的列信息（按表定义顺序和列序号排列）
+_SCHEMA_COLUMNS_QUERY = (
+    "SELECT m.name, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk "
+    "FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p "
+    "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' "
+    "ORDER BY m.rowid, p.cid"
+)
+# 单条UNION ALL行数统计语句包含的表数（SQLite复合查询默认上限为500）
+_ROW_COUNT_BATCH_SIZE = 400
+
+# 关键字段识别规则（按顺序匹配，命中第一个即停止）：
+# 前瞻组合表示列名（忽略大小写）同时包含这些片段，与顺序无关
+_FIELD_RULES = (
+    (re.compile(r'(?is)(?=.*org)(?=.*name)'), 'branch_field'),
+    (re.compile(r'(?:CUST_ID|customer_id|cust_id)\Z'), 'customer_id'),
+    (re.compile(r'(?is)(?=.*cust)(?=.*name)'), 'customer_name'),
+    (re.compile(r'(?is)(?=.*deposit)(?=.*bal)'), 'deposit_balance'),
+    (re.compile(r'(?is)(?=.*loan)(?=.*bal)'), 'loan_balance'),
+)
+
+# 数据库文件存在性检查结果的缓存时间（秒）
+_EXISTS_CHECK_TTL = 1.0
+
+# 配置文件达到该大小时使用mmap读取（小文件的mmap系统调用开销得不偿失）
+_MMAP_MIN_SIZE = 64 * 1024
+
+# 自动发现数据库文件的搜索目录（按顺序，找到即返回）
+_DB_SEARCH_ROOTS = ('./databases', './data')
+
+# 完整提示词中的通用查询指导（完全静态，不含任何查询相关内容）
+_GENERAL_GUIDANCE = """
 【重要查询指导】
-用户查询：{self.user_query}
-
 查询理解指导：
 
 【用户意图分析思路】
@@ -171,41 +110,528 @@ class QueryContext:
 5. 如有疑问，优先选择提供更全面的数据视角
 """
 
-        return f"""
+# 完整提示词模板：按内容变化频率由低到高排列（静态指导 -> 数据库级信息 -> 查询级信息），
+# 使同一数据库下的不同查询共享尽可能长的相同前缀，便于LLM服务端的前缀缓存命中
+_FULL_PROMPT_TEMPLATE = _GENERAL_GUIDANCE + """
 【业务背景知识】
 
-数据库信息：{self.schema_info.get('description', '银行业务数据库')}
-数据库路径：{self.database_path}
-数据库类型：{self.database_type}
+数据库信息：{description}
+数据库路径：{database_path}
+数据库类型：{database_type}
 
 {schema_summary}
 
-{general_guidance}
-
 业务术语定义（仅在查询明确提到时应用）：
 {terms_text}
 
 查询范围规则：
 {rules_text}
 
-用户查询：{self.user_query}
+【当前查询】
+用户查询：{user_query}
 """
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式，用于传递给NL2SQL系统"""
-        return {
-            'user_query': self.user_query,
+# 完整提示词缓存: (配置版本, 用户查询, 术语数, 规则数) -> 提示词
+_FULL_PROMPT_CACHE_SIZE = 512
+_full_prompt_cache: "OrderedDict[Tuple[int, str, int, int], str]" = OrderedDict()
+_full_prompt_cache_lock = threading.Lock()
+
+# dataclass的slots参数需要Python 3.10+；含默认值字段的数据类无法在类体中声明__slots__，旧版本下不使用slots
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True)
+class BusinessTerm:
+    """业务术语定义（不可变，实例在配置和查询上下文之间共享，字段均为不可变类型）"""
+    __slots__ = ('name', 'definition', 'data_representation', 'sql_conditions', 'examples')
+
+    name: str
+    definition: str
+    data_representation: str
+    sql_conditions: str
+    examples: Tuple[str, ...]
+
+@dataclass(frozen=True)
+class QueryScope:
+    """查询范围规则（不可变，实例在配置和查询上下文之间共享）"""
+    __slots__ = ('query_pattern', 'scope_type', 'filter_conditions', 'description')
+
+    query_pattern: str
+    scope_type: str  # 'all', 'filtered', 'specific'
+    filter_conditions: str
+    description: str
+
+
+def _quote_identifier(name: str) -> str:
+    """为SQLite标识符加双引号"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _iter_db_files(root: str, dir_mtimes: Optional[Dict[str, Optional[int]]] = None):
+    """深度优先遍历目录下的.db文件（与glob('**/*.db')顺序一致：先当前目录文件，再逐个子目录）
+
+    dir_mtimes不为None时记录实际遍历过的每个目录的mtime（在列目录之前读取，目录不存在时为None）。
+    """
+    if dir_mtimes is not None:
+        dir_mtimes[root] = _path_mtime(root)
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir():
+            subdirs.append(entry.path)
+        elif entry.name.endswith('.db'):
+            yield entry.path
+    for subdir in subdirs:
+        yield from _iter_db_files(subdir, dir_mtimes)
+
+
+# 数据库自动发现缓存: (cwd, 遍历过的各目录mtime, 发现的数据库文件)
+_discovery_cache: Optional[Tuple[str, Dict[str, Optional[int]], Optional[str]]] = None
+
+
+def _discover_database_file() -> Optional[str]:
+    """按搜索目录顺序返回找到的第一个数据库文件
+
+    结果按cwd及扫描时遍历过的每个目录（含各级子目录）的mtime缓存：任一目录中增删文件或子目录都会使缓存失效；
+    找到结果时遍历即停止，之后才会遍历到的目录中新增的文件不影响结果，无需纳入缓存键。
+    """
+    global _discovery_cache
+    cwd = os.getcwd()
+    cached = _discovery_cache
+    if (cached is not None and cached[0] == cwd
+            and all(_path_mtime(path) == mtime for path, mtime in cached[1].items())
+            and (cached[2] is None or os.path.exists(cached[2]))):
+        return cached[2]
+
+    dir_mtimes: Dict[str, Optional[int]] = {}
+    db_file = None
+    for root in _DB_SEARCH_ROOTS:
+        db_file = next(_iter_db_files(root, dir_mtimes), None)
+        if db_file:
+            break
+    _discovery_cache = (cwd, dir_mtimes, db_file)
+    return db_file
+
+
+# 共享的智能上下文管理器（模块不可用时缓存导入错误，避免每次调用重复尝试导入）
+_CTX_MGR = None
+# 智能上下文管理器工厂及其导入失败原因（在模块末尾解析）
+_get_context_manager = None
+_CTX_MGR_IMPORT_ERROR: Optional[str] = None
+
+
+def _ctx_mgr():
+    """获取共享的智能上下文管理器，不可用时抛出ImportError"""
+    global _CTX_MGR
+    if _CTX_MGR is None:
+        if _get_context_manager is None:
+            raise ImportError(_CTX_MGR_IMPORT_ERROR or "智能上下文管理器不可用")
+        _CTX_MGR = _get_context_manager()
+    return _CTX_MGR
+
+
+def _reset_ctx_mgr():
+    """清除共享的智能上下文管理器实例（用于测试）"""
+    global _CTX_MGR
+    _CTX_MGR = None
+
+
+def _path_mtime(path: Optional[str]) -> Optional[int]:
+    """文件mtime（纳秒），路径为空或文件不存在时为None"""
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_json_file(path: str) -> Any:
+    """读取JSON配置文件（优先使用orjson，不可用时回退到标准库json）
+
+    较大的文件通过mmap直接交给orjson解析，省去一次整文件的读缓冲拷贝。
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            mm = None
+            if os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # mmap不可用（如特殊文件系统）时回退到普通读取
+                    mm = None
+            if mm is not None:
+                with mm, memoryview(mm) as view:
+                    return orjson.loads(view)
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# 默认NL2SQL配置（模块加载时构建一次，嵌套结构同样只读）
+_DEFAULT_NL2SQL_CONFIG = MappingProxyType({
+    "prompt_templates": MappingProxyType({
+        "default": "你是一个专业的SQL生成专家。请基于以下信息生成SQL查询：\n\n用户查询：{user_query}\n\n请生成SQL语句："
+    }),
+    "sql_generation_rules": MappingProxyType({
+        "constraints": MappingProxyType({
+            "forbidden_time_filters": (),
+            "forbidden_reason": ""
+        })
+    }),
+    "query_type_mapping": MappingProxyType({
+        "patterns": (
+            MappingProxyType({
+                "pattern": ".*",
+                "type": "simple_query",
+                "complexity": "simple",
+                "priority": 1
+            }),
+        )
+    })
+})
+
+# 配置一致性检查要求必须存在映射的逻辑字段
+_CONSISTENCY_CRITICAL_FIELDS = frozenset({"host_org_name", "CUST_ID"})
+
+# 关键字段的自动映射规则：逻辑字段 -> 按优先级排列的候选实际字段名
+_AUTO_MAPPING_RULES: Dict[str, Tuple[str, ...]] = {
+    'host_org_name': ('host_org_name', 'BRANCH_NAME', 'acg_org_blng_lv1_branch_name', 'org_name', 'branch'),
+    'CUST_ID': ('CUST_ID', 'cust_id', 'customer_id', 'cust_no', 'CUST_NO'),
+    'corp_deposit_y_avg_bal': ('corp_deposit_y_avg_bal', 'avg_deposit', 'yearly_avg_balance', 'deposit_avg'),
+    'CUST_NAME': ('CUST_NAME', 'cust_name', 'customer_name', 'name'),
+    'corp_deposit_bal': ('corp_deposit_bal', 'deposit_balance', 'current_balance'),
+    'loan_bal_rmb': ('loan_bal_rmb', 'loan_balance', 'loan_bal'),
+    'CONTRACT_CL_RESULT': ('CONTRACT_CL_RESULT', 'classification_result', 'cl_result')
+}
+
+# 反向索引：候选实际字段名 -> [(逻辑字段, 优先级)]
+_AUTO_MAPPING_CANDIDATES: Dict[str, List[Tuple[str, int]]] = {}
+for _logical_field, _possible_names in _AUTO_MAPPING_RULES.items():
+    for _rank, _possible_name in enumerate(_possible_names):
+        _AUTO_MAPPING_CANDIDATES.setdefault(_possible_name, []).append((_logical_field, _rank))
+del _logical_field, _possible_names, _rank, _possible_name
+
+
+# schema_info中与表并列存放的描述性元数据键
+_SCHEMA_META_KEYS = frozenset({'description', 'database_type', 'total_tables'})
+
+
+def _schema_tables(schema_info: Dict[str, Any]) -> List[str]:
+    """schema_info中的表名（排除描述性元数据键，保持原有顺序）"""
+    return [k for k in schema_info if k not in _SCHEMA_META_KEYS]
+
+
+def _schema_field_names(schema_info: Dict[str, Any]) -> set:
+    """schema_info中所有表的实际字段名集合"""
+    actual_fields = set()
+    for table_name in schema_info.keys() - _SCHEMA_META_KEYS:
+        table_info = schema_info[table_name]
+        if isinstance(table_info, dict) and 'columns' in table_info:
+            # 加载Schema时列信息已统一为带name键的字典
+            actual_fields.update(column['name'] for column in table_info['columns'])
+    return actual_fields
+
+
+def _compile_query_patterns(patterns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """为查询模式预编译正则，写入'_compiled'键
+
+    匹配查询时应使用 pattern['_compiled'].search(query)，避免每次查询重新解析正则。
+    """
+    for pattern in patterns:
+        pattern['_compiled'] = re.compile(pattern['pattern'])
+    return patterns
+
+
+# 数据库上下文配置文件解析结果缓存：路径 -> ((mtime_ns, size), 解析后的数据)
+_CONTEXT_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+
+def _load_context_config(path: str) -> Optional[Any]:
+    """读取数据库上下文配置文件，文件不存在时返回None
+
+    解析结果按(mtime, size)缓存，重复切换到同一数据库时不再重新解析JSON。
+    返回的对象在调用方之间共享，只读使用。
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _CONTEXT_CONFIG_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    data = _load_json_file(path)
+    _CONTEXT_CONFIG_CACHE[path] = (key, data)
+    return data
+
+
+def _render_schema_summary(table_relationships: Optional[Dict[str, Any]]) -> str:
+    """渲染完整提示词中的表关系和JOIN条件段落（同一数据库下对所有查询相同）"""
+    if not table_relationships:
+        return ""
+
+    schema_parts = [
+        "【重要：表关系和 JOIN 条件】\n",
+        "生成 SQL 时必须严格按照以下 JOIN 条件：\n",
+    ]
+    for rel_name, rel_info in table_relationships.items():
+        from_table = rel_info.get('from_table', '')
+        to_table = rel_info.get('to_table', '')
+        from_field = rel_info.get('from_field', '')
+        to_field = rel_info.get('to_field', '')
+        schema_parts.append(f"- {from_table}.{from_field} = {to_table}.{to_field}\n")
+
+    schema_parts.append("\n⚠️ 注意：字段名包含中文，请使用准确的字段名：\n")
+    schema_parts.append("- CORP_LOAN_CONTRACT_INFO 表的客户字段是：客户编号\n")
+    schema_parts.append("- CORP_LOAN_CONTRACT_INFO 表的合同字段是：合同编号\n")
+    schema_parts.append("- CONT_RACTCLASSIFY 表的合同字段是：CONTRACT_NO\n")
+    return "".join(schema_parts)
+
+
+class PatternIndex:
+    """多模式子串索引 - 一次扫描文本，返回所有出现的模式对应的值（包含相互重叠的匹配）"""
+
+    def __init__(self, patterns: Dict[str, set]):
+        self._automaton = None
+        self._regex = None
+        if not patterns:
+            return
+
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, values in patterns.items():
+                self._automaton.add_word(pattern, frozenset(values))
+            self._automaton.make_automaton()
+            return
+
+        # 无pyahocorasick时使用预编译正则：零宽前瞻在每个位置取最长模式，
+        # 同一位置上更短的模式必然是它的前缀，由前缀闭包一并补全
+        ordered = sorted(patterns, key=len, reverse=True)
+        self._regex = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+        # 模式首字符集合：文本中不含任何首字符时无需运行正则
+        self._first_chars = frozenset(pattern[0] for pattern in ordered)
+        self._prefix_closure: Dict[str, frozenset] = {}
+        for pattern in ordered:
+            values = set()
+            for length in range(1, len(pattern) + 1):
+                values.update(patterns.get(pattern[:length], ()))
+            self._prefix_closure[pattern] = frozenset(values)
+
+    def match(self, text: str) -> set:
+        """返回文本中出现的所有模式对应的值集合"""
+        matched = set()
+        if self._automaton is not None:
+            for _, values in self._automaton.iter(text):
+                matched.update(values)
+        elif self._regex is not None:
+            if self._first_chars.isdisjoint(text):
+                return matched
+            closure = self._prefix_closure
+            for pattern in set(self._regex.findall(text)):
+                matched.update(closure[pattern])
+        return matched
+
+
+class TermMatcher:
+    """业务术语多模式匹配器 - 一次扫描查询文本，找出所有被提及的术语"""
+
+    def __init__(self, business_terms: Dict[str, BusinessTerm]):
+        # 匹配模式 -> 术语键集合（术语键、术语名及术语名按空白拆分的关键词）
+        patterns: Dict[str, set] = {}
+        for term_key, term in business_terms.items():
+            for pattern in {term_key, term.name, *term.name.split()}:
+                if pattern:
+                    patterns.setdefault(pattern, set()).add(term_key)
+        self._index = PatternIndex(patterns)
+
+        # 预渲染每个术语在提示词中的片段（按术语定义顺序）
+        self.snippets: Dict[str, str] = {
+            term_key: f"- {term.name}：{term.definition}\n  数据表示：{term.data_representation}\n"
+            for term_key, term in business_terms.items()
+        }
+
+    def match(self, text: str) -> set:
+        """返回文本中提及的术语键集合（包含相互重叠的匹配）"""
+        return self._index.match(text)
+
+    def render(self, text: str) -> str:
+        """渲染文本中提及的术语定义片段"""
+        matched = self.match(text)
+        if not matched:
+            return ""
+        return "".join(snippet for term_key, snippet in self.snippets.items() if term_key in matched)
+
+
+class RuleIndex:
+    """查询范围规则的不可变快照及其模式索引（按对象身份哈希，可作为缓存键）"""
+
+    __slots__ = ('rules', 'always_indexes', 'pattern_index')
+
+    def __init__(self, rules: Tuple[QueryScope, ...], always_indexes: Tuple[int, ...],
+                 pattern_index: PatternIndex):
+        self.rules = rules
+        self.always_indexes = always_indexes
+        self.pattern_index = pattern_index
+
+
+@lru_cache(maxsize=1024)
+def _scan_rules(query: str, rule_index: RuleIndex) -> Tuple[QueryScope, ...]:
+    """扫描查询适用的范围规则（规则变化时会生成新的RuleIndex，旧缓存项自然失效）"""
+    matched = rule_index.pattern_index.match(query)
+    matched.update(rule_index.always_indexes)
+    return tuple(rule_index.rules[index] for index in sorted(matched))
+
+
+@dataclass(**_DATACLASS_SLOTS)
+class QueryContext:
+    """统一的查询上下文 - 包含查询执行所需的所有信息"""
+    user_query: str
+    database_path: str
+    database_type: str
+    business_terms: Dict[str, BusinessTerm]
+    schema_info: Dict[str, Any]
+    query_scope_rules: List[QueryScope]
+    table_relationships: Dict[str, Any] = None
+    config_version: Optional[int] = None  # 生成该上下文的UnifiedConfig配置版本
+    term_matcher: Optional[TermMatcher] = field(default=None, repr=False, compare=False)  # 基于business_terms预构建的匹配器
+    schema_summary_text: Optional[str] = field(default=None, repr=False, compare=False)  # 预渲染的表关系段落
+    _dict_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+
+    def to_full_prompt(self) -> str:
+        """生成包含所有上下文的完整提示词（同一配置版本下按查询缓存）"""
+        if self.config_version is None:
+            return self._render_full_prompt()
+
+        # 配置版本确定了术语、规则、Schema和表关系的内容；
+        # 术语数和规则数区分同一版本下create_context与create_query_context生成的不同上下文
+        cache_key = (self.config_version, self.user_query,
+                     len(self.business_terms), len(self.query_scope_rules))
+        with _full_prompt_cache_lock:
+            prompt = _full_prompt_cache.get(cache_key)
+            if prompt is not None:
+                _full_prompt_cache.move_to_end(cache_key)
+                return prompt
+
+        prompt = self._render_full_prompt()
+
+        with _full_prompt_cache_lock:
+            _full_prompt_cache[cache_key] = prompt
+            if len(_full_prompt_cache) > _FULL_PROMPT_CACHE_SIZE:
+                _full_prompt_cache.popitem(last=False)
+        return prompt
+
+    def _render_full_prompt(self) -> str:
+        """渲染完整提示词"""
+        # 🚀 修复：只包含查询中明确提到的业务术语
+        # 一次多模式扫描得到查询中提到的全部术语（未预构建匹配器时临时构建）
+        term_matcher = self.term_matcher or TermMatcher(self.business_terms)
+        terms_text = term_matcher.render(self.user_query)
+
+        # 格式化查询范围规则（规则条数已知，按位置填充）
+        rule_parts = [None] * len(self.query_scope_rules)
+        for index, rule in enumerate(self.query_scope_rules):
+            rule_parts[index] = f"- {rule.description}\n  筛选条件：{rule.filter_conditions}\n"
+        rules_text = "".join(rule_parts)
+
+        # 表关系信息（UnifiedConfig按配置版本预渲染，未提供时现场渲染）
+        schema_summary = self.schema_summary_text
+        if schema_summary is None:
+            schema_summary = _render_schema_summary(self.table_relationships)
+
+        return _FULL_PROMPT_TEMPLATE.format_map({
+            'description': self.schema_info.get('description', '银行业务数据库'),
             'database_path': self.database_path,
             'database_type': self.database_type,
-            'business_context': self.to_full_prompt(),
-            'schema_info': self.schema_info
-        }
+            'schema_summary': schema_summary,
+            'terms_text': terms_text,
+            'rules_text': rules_text,
+            'user_query': self.user_query
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式，用于传递给NL2SQL系统
+
+        结果在首次调用时生成并缓存，上下文创建后不应再修改字段；
+        需要不同内容时请用 dataclasses.replace 生成新的上下文。
+        """
+        if self._dict_cache is None:
+            self._dict_cache = {
+                'user_query': self.user_query,
+                'database_path': self.database_path,
+                'database_type': self.database_type,
+                'business_context': self.to_full_prompt(),
+                'schema_info': self.schema_info
+            }
+        return self._dict_cache
+
+
+class _LazyConfigField:
+    """UnifiedConfig的延迟加载配置属性 - 首次读取时才触发完整的配置加载"""
+
+    def __set_name__(self, owner, name):
+        self.storage_name = f"_lazy_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if not instance._configs_loaded:
+            instance._ensure_configs_loaded()
+        return instance.__dict__[self.storage_name]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.storage_name] = value
+
+
+class _ScopeRulesField(_LazyConfigField):
+    """查询范围规则属性 - 赋值时统一转换为QueryScope对象列表"""
+
+    def __set__(self, instance, value):
+        super().__set__(instance, [_to_query_scope(rule) for rule in value or []])
+
+
+def _to_query_scope(rule) -> QueryScope:
+    """把字典格式的范围规则转换为QueryScope（其他对象原样返回）"""
+    if isinstance(rule, dict):
+        return QueryScope(
+            query_pattern=rule.get('query_pattern', ''),
+            scope_type=rule.get('scope_type', 'filtered'),
+            filter_conditions=rule.get('filter_conditions', ''),
+            description=rule.get('description', '')
+        )
+    return rule
 
 
 class UnifiedConfig:
     """统一的配置管理器 - 整合所有配置系统，消除配置冲突"""
 
+    # 以下配置在首次访问时加载（数据库发现、Schema提取等开销较大）
+    database_path = _LazyConfigField()
+    database_type = _LazyConfigField()
+    business_terms = _LazyConfigField()
+    schema_info = _LazyConfigField()
+    query_scope_rules = _ScopeRulesField()
+    field_mappings = _LazyConfigField()
+    table_relationships = _LazyConfigField()
+    nl2sql_config = _LazyConfigField()
+    prompt_templates = _LazyConfigField()
+    query_patterns = _LazyConfigField()
+    sql_constraints = _LazyConfigField()
+    _config_version = _LazyConfigField()
+
     def __init__(self):
+        self._configs_loaded = False
+        self._configs_loading = False
+        self._configs_lock = threading.RLock()
+
         self.database_path: Optional[str] = None
         self.database_type: Optional[str] = None
         self.business_terms: Dict[str, BusinessTerm] = {}
@@ -220,15 +646,61 @@ class UnifiedConfig:
         self.query_patterns: List[Dict[str, Any]] = []  # 查询模式
         self.sql_constraints: Dict[str, Any] = {}  # SQL约束规则
 
-        # 初始化配置
-        self._load_all_configs()
+        # 配置版本号（用于缓存失效）
+        self._config_version = next(_config_versions)
+        self._term_matcher: Optional[TermMatcher] = None
+        # Schema提取使用的SQLite连接：(路径, 设备号, inode) -> 连接
+        self._schema_conn: Optional[sqlite3.Connection] = None
+        self._schema_conn_key: Optional[Tuple[str, int, int]] = None
+        # 数据库文件存在性检查缓存：(检查时间, 路径, 是否存在)
+        self._last_exists_check: Tuple[float, Optional[str], bool] = (0.0, None, False)
+        # 各加载器上次加载时的数据源键：(数据库路径, 相关文件mtime...)
+        self._load_keys: Dict[str, Tuple] = {}
+        self._term_matcher_version: Optional[int] = None
+        self._rule_index: Optional[RuleIndex] = None
+        self._rule_index_key: Optional[Tuple[int, int, int]] = None
+        self._schema_summary_text: Optional[str] = None
+        self._nl2sql_schema_summary: str = ""
+        self._nl2sql_schema_summary_version: Optional[int] = None
+        self._status_counts: Dict[str, int] = {}
+        self._status_counts_version: Optional[int] = None
+        self._schema_summary_version: Optional[int] = None
+        # _check_consistency结果缓存及其键
+        self._consistency_key: Optional[Tuple] = None
+        self._consistency_result = False
+        # update_global_config_database上次更新时的(数据库路径, mtime)
+        self._global_update_key: Optional[Tuple[str, Optional[int]]] = None
+        # get_nl2sql_config返回的只读视图（加载/更新NL2SQL配置时失效）
+        self._nl2sql_config_view: Optional[Mapping[str, Any]] = None
+
+    def _ensure_configs_loaded(self):
+        """首次访问配置时执行完整加载（加载过程中的嵌套访问直接返回当前值）"""
+        with self._configs_lock:
+            if self._configs_loaded or self._configs_loading:
+                return
+            self._configs_loading = True
+            try:
+                # 初始化配置
+                self._load_all_configs()
+
+                # 验证配置一致性
+                self._validate_config_consistency()
+            finally:
+                self._configs_loading = False
+                self._configs_loaded = True
+
+    def _take_over_initial_load(self) -> bool:
+        """配置尚未加载时由显式的数据库切换接管初始化，跳过自动发现数据库"""
+        with self._configs_lock:
+            if self._configs_loaded or self._configs_loading:
+                return False
+            self._configs_loaded = True
+            self._load_nl2sql_config()
+            return True
 
-        # 验证配置一致性
-        self._validate_config_consistency()
-    
     def _load_all_configs(self):
         """加载所有配置信息 - 统一管理，消除冲突"""
-        print("[DEBUG] UnifiedConfig: 开始加载所有配置...")
+        logger.debug("开始加载所有配置...")
 
         # 1. 加载数据库路径配置（不自动选择数据库）
         self._load_database_config()
@@ -241,99 +713,126 @@ class UnifiedConfig:
 
         # 4. 只有在有数据库路径时才加载Schema相关配置
         if self.database_path:
-            print("[DEBUG] UnifiedConfig: 有数据库路径，加载Schema相关配置")
+            logger.debug("有数据库路径，加载Schema相关配置")
             self._load_schema_info()
             self._load_field_mappings()
             self._load_table_relationships()
         else:
-            print("[DEBUG] UnifiedConfig: 无数据库路径，跳过Schema相关配置加载")
+            logger.debug("无数据库路径，跳过Schema相关配置加载")
             self.schema_info = {}
             self.field_mappings = {}
             self.table_relationships = {}
 
-        print(f"[DEBUG] UnifiedConfig: 配置加载完成")
-        print(f"  - 数据库路径: {self.database_path}")
-        print(f"  - 数据库类型: {self.database_type}")
-        print(f"  - 业务术语数量: {len(self.business_terms)}")
-        print(f"  - 查询规则数量: {len(self.query_scope_rules)}")
-        print(f"  - 字段映射数量: {len(self.field_mappings)}")
-        print(f"  - 表关系数量: {len(self.table_relationships)}")
+        self._bump_config_version()
+
+        logger.debug(
+            "配置加载完成\n  - 数据库路径: %s\n  - 数据库类型: %s\n  - 业务术语数量: %s"
+            "\n  - 查询规则数量: %s\n  - 字段映射数量: %s\n  - 表关系数量: %s",
+            self.database_path, self.database_type, len(self.business_terms),
+            len(self.query_scope_rules), len(self.field_mappings), len(self.table_relationships)
+        )
     
+    def _bump_config_version(self):
+        """配置发生变化后分配新版本号，使依赖旧配置的缓存失效"""
+        self._config_version = next(_config_versions)
+
+    def _context_config_path(self) -> Optional[str]:
+        """当前数据库对应的上下文配置文件路径"""
+        if not self.database_path:
+            return None
+        db_name = os.path.splitext(os.path.basename(self.database_path))[0]
+        return f"configs/database_contexts/{db_name}_context.json"
+
+    def _source_key(self, loader: str, force: bool, *extra_paths: Optional[str]) -> Optional[Tuple]:
+        """返回加载器数据源（数据库路径及相关文件mtime）的来源键；自上次成功加载后未变化时返回None"""
+        key = (self.database_path,) + tuple(
+            _path_mtime(path) for path in (self.database_path, *extra_paths)
+        )
+        if not force and self._load_keys.get(loader) == key:
+            logger.debug("数据源未变化，跳过重新加载: %s", loader)
+            return None
+        return key
+
+    def _mark_loaded(self, loader: str, key: Tuple):
+        """记录加载器成功加载时的来源键（加载失败时不记录，下次调用会重试）"""
+        self._load_keys[loader] = key
+
+    def _schema_table_count(self) -> int:
+        """schema_info中的表数量（排除描述性元数据键）"""
+        return len(self.schema_info.keys() - _SCHEMA_META_KEYS)
+
+    def _get_schema_summary_text(self) -> str:
+        """获取当前表关系的提示词段落（配置版本变化后重新渲染）"""
+        if self._schema_summary_version != self._config_version:
+            self._schema_summary_text = _render_schema_summary(self.table_relationships)
+            self._schema_summary_version = self._config_version
+        return self._schema_summary_text
+
+    def _get_term_matcher(self) -> TermMatcher:
+        """获取当前业务术语的匹配器（配置版本变化后重建）"""
+        if self._term_matcher_version != self._config_version:
+            self._term_matcher = TermMatcher(self.business_terms)
+            self._term_matcher_version = self._config_version
+        return self._term_matcher
+
     def _load_database_config(self):
         """加载数据库配置 - 自动发现并切换到可用数据库"""
         try:
-            print("[DEBUG] UnifiedConfig: 开始自动发现和加载数据库...")
+            logger.debug("开始自动发现和加载数据库...")
 
             # 首先尝试从智能上下文管理器获取
             try:
-                from .intelligent_context_manager import IntelligentContextManager
-                context_manager = IntelligentContextManager()
+                context_manager = _ctx_mgr()
                 all_contexts = context_manager.get_available_databases()
 
                 available_count = len(all_contexts)
-                print(f"[INFO] UnifiedConfig: 发现 {available_count} 个可用数据库配置")
+                logger.info("发现 %s 个可用数据库配置", available_count)
 
                 # 如果有可用的数据库配置，自动选择第一个
                 if all_contexts:
                     first_db = list(all_contexts.keys())[0]
-                    print(f"[INFO] UnifiedConfig: 自动选择数据库: {first_db}")
+                    logger.info("自动选择数据库: %s", first_db)
                     if self.switch_database(first_db):
                         return
 
             except ImportError:
-                print("[DEBUG] UnifiedConfig: 智能上下文管理器不可用，使用自动发现")
+                logger.debug("智能上下文管理器不可用，使用自动发现")
 
             # 自动发现数据库文件
             discovered_db = self._discover_database()
             if discovered_db:
-                print(f"[INFO] UnifiedConfig: 发现数据库文件: {discovered_db}")
+                logger.info("发现数据库文件: %s", discovered_db)
                 # 自动切换到发现的数据库
                 if self._auto_switch_database(discovered_db):
-                    print(f"[INFO] UnifiedConfig: 自动切换数据库成功: {discovered_db}")
+                    logger.info("自动切换数据库成功: %s", discovered_db)
                     return
 
-            print("[WARNING] UnifiedConfig: 未找到可用数据库，使用空配置")
+            logger.warning("未找到可用数据库，使用空配置")
             self.database_path = None
             self.database_type = None
 
         except Exception as e:
-            print(f"[WARNING] UnifiedConfig: 检查数据库配置失败: {e}")
+            logger.warning("检查数据库配置失败: %s", e)
             self.database_path = None
             self.database_type = None
 
     def _discover_database(self) -> Optional[str]:
-        """自动发现可用的数据库文件"""
-        import glob
-
-        # 搜索数据库目录
-        search_paths = [
-            './databases/**/*.db',
-            './databases/*.db',
-            './data/**/*.db',
-            './data/*.db'
-        ]
-
-        for pattern in search_paths:
-            db_files = glob.glob(pattern, recursive=True)
-            if db_files:
-                # 返回第一个找到的数据库文件
-                return db_files[0]
-
-        return None
+        """自动发现可用的数据库文件（按遍历过的目录mtime缓存结果）"""
+        return _discover_database_file()
 
     def _auto_switch_database(self, database_path: str) -> bool:
         """自动切换到指定数据库并配置字段映射"""
         try:
             # 检查数据库是否存在
             if not os.path.exists(database_path):
-                print(f"[ERROR] 数据库文件不存在: {database_path}")
+                logger.error("数据库文件不存在: %s", database_path)
                 return False
 
             # 设置数据库路径和类型
             self.database_path = database_path
             self.database_type = 'sqlite'  # 假设是SQLite数据库
 
-            print(f"[INFO] UnifiedConfig: 自动切换数据库到: {database_path}")
+            logger.info("自动切换数据库到: %s", database_path)
 
             # 加载数据库相关配置
             self._determine_database_type()
@@ -344,17 +843,20 @@ class UnifiedConfig:
 
             # 自动配置缺失的字段映射
             self._auto_configure_field_mappings()
-
-            print(f"[INFO] ✅ UnifiedConfig自动数据库配置完成!")
-            print(f"  - 数据库路径: {self.database_path}")
-            print(f"  - 数据库类型: {self.database_type}")
-            print(f"  - Schema表数量: {len([k for k in self.schema_info.keys() if k not in ['description', 'database_type', 'total_tables']])}")
-            print(f"  - 字段映射数量: {len(self.field_mappings)}")
+            self._bump_config_version()
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "✅ UnifiedConfig自动数据库配置完成!\n  - 数据库路径: %s\n  - 数据库类型: %s"
+                    "\n  - Schema表数量: %s\n  - 字段映射数量: %s",
+                    self.database_path, self.database_type,
+                    self._schema_table_count(), len(self.field_mappings)
+                )
 
             return True
 
         except Exception as e:
-            print(f"[ERROR] 自动切换数据库失败: {e}")
+            logger.exception("自动切换数据库失败: %s", e)
             return False
 
     def switch_database(self, database_path: str) -> bool:
@@ -368,20 +870,20 @@ class UnifiedConfig:
             bool: 切换是否成功
         """
         try:
-            print(f"[INFO] UnifiedConfig: 开始切换数据库到: {database_path}")
+            logger.info("开始切换数据库到: %s", database_path)
 
             # 检查数据库是否存在
             if not os.path.exists(database_path):
-                print(f"[ERROR] 数据库文件不存在: {database_path}")
+                logger.error("数据库文件不存在: %s", database_path)
                 return False
 
             # 使用智能上下文管理器进行切换
-            from .intelligent_context_manager import get_context_manager
-
-            context_manager = get_context_manager()
+            context_manager = _ctx_mgr()
             success = context_manager.switch_context(database_path)
 
             if success:
+                initial_load = self._take_over_initial_load()
+
                 # 更新UnifiedConfig的状态
                 old_database_path = self.database_path
                 self.database_path = database_path
@@ -392,22 +894,26 @@ class UnifiedConfig:
                 self._load_schema_info()
                 self._load_field_mappings()
                 self._load_table_relationships()
+                self._bump_config_version()
+
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "✅ UnifiedConfig数据库切换成功!\n  - 原数据库: %s\n  - 新数据库: %s\n  - 数据库类型: %s"
+                        "\n  - Schema表数量: %s\n  - 字段映射数量: %s\n  - 表关系数量: %s",
+                        old_database_path, self.database_path, self.database_type,
+                        self._schema_table_count(), len(self.field_mappings), len(self.table_relationships)
+                    )
 
-                print(f"[INFO] ✅ UnifiedConfig数据库切换成功!")
-                print(f"  - 原数据库: {old_database_path}")
-                print(f"  - 新数据库: {self.database_path}")
-                print(f"  - 数据库类型: {self.database_type}")
-                print(f"  - Schema表数量: {len([k for k in self.schema_info.keys() if k not in ['description', 'database_type', 'total_tables']])}")
-                print(f"  - 字段映射数量: {len(self.field_mappings)}")
-                print(f"  - 表关系数量: {len(self.table_relationships)}")
+                if initial_load:
+                    self._validate_config_consistency()
 
                 return True
             else:
-                print(f"[ERROR] 智能上下文管理器切换失败")
+                logger.error("智能上下文管理器切换失败")
                 return False
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 数据库切换失败: {e}")
+            logger.exception("数据库切换失败: %s", e)
             return False
 
     def get_available_databases(self) -> Dict[str, Dict[str, Any]]:
@@ -418,9 +924,7 @@ class UnifiedConfig:
             Dict[str, Dict[str, Any]]: 数据库路径 -> 数据库信息
         """
         try:
-            from .intelligent_context_manager import get_context_manager
-
-            context_manager = get_context_manager()
+            context_manager = _ctx_mgr()
             all_contexts = context_manager.get_available_databases()
 
             available_databases = {}
@@ -435,11 +939,11 @@ class UnifiedConfig:
                     current_project_db_path = os.path.join(os.getcwd(), db_filename)
 
                     if os.path.exists(current_project_db_path):
-                        print(f"[INFO] 找到当前项目中的数据库文件: {current_project_db_path}")
+                        logger.info("找到当前项目中的数据库文件: %s", current_project_db_path)
                         db_path = current_project_db_path
                     else:
-                        print(f"[WARNING] 数据库文件不存在: {context_info['database_path']}")
-                        print(f"[WARNING] 当前项目中也未找到: {current_project_db_path}")
+                        logger.warning("数据库文件不存在: %s", context_info['database_path'])
+                        logger.warning("当前项目中也未找到: %s", current_project_db_path)
                         # 仍然添加到列表中，但标记为不可用
                         available_databases[context_info['database_path']] = {
                             'name': context_info['database_name'],
@@ -478,7 +982,7 @@ class UnifiedConfig:
             return available_databases
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 获取可用数据库列表失败: {e}")
+            logger.exception("获取可用数据库列表失败: %s", e)
             return {}
     
     def _determine_database_type(self):
@@ -489,45 +993,48 @@ class UnifiedConfig:
         try:
             from .dynamic_schema_extractor import determine_database_type
             self.database_type = determine_database_type(self.database_path)
-            print(f"[DEBUG] UnifiedConfig: 确定数据库类型: {self.database_type}")
+            logger.debug("确定数据库类型: %s", self.database_type)
         except Exception as e:
-            print(f"[WARNING] UnifiedConfig: 确定数据库类型失败: {e}")
+            logger.warning("确定数据库类型失败: %s", e)
             self.database_type = 'unknown'
     
-    def _load_business_knowledge(self):
+    def _load_business_knowledge(self, force: bool = False):
         """加载业务知识配置 - 优先从数据库特定上下文加载"""
+        source_key = self._source_key('business_knowledge', force, self._context_config_path())
+        if source_key is None:
+            return
+
         try:
             # 如果有数据库路径，优先从数据库特定上下文加载业务术语
             if self.database_path:
-                print(f"[DEBUG] UnifiedConfig: 从数据库特定上下文加载业务知识")
+                logger.debug("从数据库特定上下文加载业务知识")
 
                 # 尝试从智能上下文管理器加载
                 try:
-                    from .intelligent_context_manager import get_context_manager
-                    context_manager = get_context_manager()
+                    context_manager = _ctx_mgr()
                     db_context = context_manager.get_or_create_context(self.database_path)
 
                     if db_context:
                         self._load_from_context_manager(db_context)
+                        self._mark_loaded('business_knowledge', source_key)
                         return
 
                 except ImportError:
-                    print(f"[DEBUG] UnifiedConfig: 智能上下文管理器不可用，从配置文件加载")
+                    logger.debug("智能上下文管理器不可用，从配置文件加载")
 
                 # 从配置文件直接加载
                 self._load_from_config_files()
 
 
             else:
-                print(f"[DEBUG] UnifiedConfig: 无数据库路径，使用空业务知识配置")
+                logger.debug("无数据库路径，使用空业务知识配置")
                 self.business_terms = {}
                 self.query_scope_rules = []
 
-            print(f"[DEBUG] UnifiedConfig: 业务知识加载成功")
+            logger.debug("业务知识加载成功")
+            self._mark_loaded('business_knowledge', source_key)
         except Exception as e:
-            print(f"[WARNING] UnifiedConfig: 加载业务知识失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("加载业务知识失败: %s", e, exc_info=True)
             # 确保有默认值
             self.business_terms = {}
             self.query_scope_rules = []
@@ -555,10 +1062,10 @@ class UnifiedConfig:
                     definition=term_data.get('definition', ''),
                     data_representation=term_data.get('category', '数据库特定'),
                     sql_conditions=term_data.get('sql_conditions', ''),
-                    examples=[]
+                    examples=()
                 )
 
-            print(f"[DEBUG] UnifiedConfig: 从数据库特定上下文加载业务术语 {len(self.business_terms)} 个")
+            logger.debug("从数据库特定上下文加载业务术语 %s 个", len(self.business_terms))
 
             # 加载数据库特定的查询范围
             if db_context_data.get('database_specific_query_scopes'):
@@ -571,13 +1078,13 @@ class UnifiedConfig:
                             filter_conditions=rule.get('condition', ''),
                             description=rule.get('description', '')
                         ))
-                print(f"[DEBUG] UnifiedConfig: 从数据库特定上下文加载查询范围 {len(self.query_scope_rules)} 个")
+                logger.debug("从数据库特定上下文加载查询范围 %s 个", len(self.query_scope_rules))
             else:
                 self.query_scope_rules = []
 
         elif db_context and hasattr(db_context, 'business_terms') and db_context.business_terms:
             # 回退到原始业务术语
-            print(f"[DEBUG] UnifiedConfig: 使用原始业务术语作为回退")
+            logger.debug("使用原始业务术语作为回退")
             self.business_terms = {}
 
             # 转换原始业务术语格式
@@ -588,7 +1095,7 @@ class UnifiedConfig:
                         definition=term_data.get('definition', ''),
                         data_representation='银行业务',
                         sql_conditions=term_data.get('calculation', ''),
-                        examples=[]
+                        examples=()
                     )
                 else:
                     self.business_terms[term_name] = BusinessTerm(
@@ -596,39 +1103,32 @@ class UnifiedConfig:
                         definition=str(term_data),
                         data_representation='银行业务',
                         sql_conditions='',
-                        examples=[]
+                        examples=()
                     )
 
-            print(f"[DEBUG] UnifiedConfig: 从原始业务术语加载 {len(self.business_terms)} 个")
+            logger.debug("从原始业务术语加载 %s 个", len(self.business_terms))
             self.query_scope_rules = []
 
         else:
-            print(f"[DEBUG] UnifiedConfig: 数据库上下文无业务术语，使用空配置")
+            logger.debug("数据库上下文无业务术语，使用空配置")
             self.business_terms = {}
             self.query_scope_rules = []
 
     def _load_from_config_files(self):
         """从配置文件直接加载业务知识"""
-        import json
-        import glob
-
         # 根据数据库路径确定配置文件
-        db_name = os.path.splitext(os.path.basename(self.database_path))[0]
-        config_pattern = f"configs/database_contexts/{db_name}_context.json"
+        config_file = self._context_config_path()
 
-        config_files = glob.glob(config_pattern)
-        if not config_files:
-            print(f"[WARNING] UnifiedConfig: 未找到配置文件: {config_pattern}")
+        if not os.path.isfile(config_file):
+            logger.warning("未找到配置文件: %s", config_file)
             self.business_terms = {}
             self.query_scope_rules = []
             return
 
-        config_file = config_files[0]
-        print(f"[INFO] UnifiedConfig: 从配置文件加载: {config_file}")
+        logger.info("从配置文件加载: %s", config_file)
 
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            config_data = _load_context_config(config_file) or {}
 
             # 加载业务术语
             self.business_terms = {}
@@ -639,10 +1139,10 @@ class UnifiedConfig:
                     definition=definition,
                     data_representation="银行业务",
                     sql_conditions=definition if any(keyword in definition for keyword in ['SELECT', 'WHERE', 'CASE', '=']) else "",
-                    examples=[]
+                    examples=()
                 )
 
-            print(f"[INFO] UnifiedConfig: 从配置文件加载业务术语 {len(self.business_terms)} 个")
+            logger.info("从配置文件加载业务术语 %s 个", len(self.business_terms))
 
             # 加载查询范围规则
             self.query_scope_rules = []
@@ -656,42 +1156,48 @@ class UnifiedConfig:
                         description=rule.get('description', '')
                     ))
 
-            print(f"[INFO] UnifiedConfig: 从配置文件加载查询规则 {len(self.query_scope_rules)} 个")
+            logger.info("从配置文件加载查询规则 %s 个", len(self.query_scope_rules))
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 配置文件加载失败: {e}")
+            logger.exception("配置文件加载失败: %s", e)
             self.business_terms = {}
             self.query_scope_rules = []
 
-    def _load_schema_info(self):
+    def _load_schema_info(self, force: bool = False):
         """加载Schema信息 - 使用动态上下文管理器"""
+        source_key = self._source_key('schema_info', force)
+        if source_key is None:
+            return
+
         try:
             if self.database_path:
-                print(f"[DEBUG] UnifiedConfig: 加载Schema信息")
+                logger.debug("加载Schema信息")
 
                 # 尝试使用智能上下文管理器
                 try:
-                    from .intelligent_context_manager import get_context_manager
-                    context_manager = get_context_manager()
+                    context_manager = _ctx_mgr()
                     db_context = context_manager.get_or_create_context(self.database_path)
 
                     if db_context:
-                        print(f"[INFO] UnifiedConfig: 使用智能上下文管理器加载Schema")
+                        logger.info("使用智能上下文管理器加载Schema")
                         self._load_schema_from_context(db_context)
+                        self._mark_loaded('schema_info', source_key)
                         return
 
                 except ImportError:
-                    print("[DEBUG] UnifiedConfig: 智能上下文管理器不可用，使用直接数据库读取")
+                    logger.debug("智能上下文管理器不可用，使用直接数据库读取")
 
                 # 直接从SQLite数据库读取Schema
                 self.schema_info = self._extract_sqlite_schema()
 
             else:
-                print(f"[WARNING] UnifiedConfig: 数据库路径为空，无法加载Schema")
+                logger.warning("数据库路径为空，无法加载Schema")
                 self.schema_info = {}
 
+            self._mark_loaded('schema_info', source_key)
+
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: Schema加载失败: {e}")
+            logger.exception("Schema加载失败: %s", e)
             self.schema_info = {}
 
     def _load_schema_from_context(self, db_context):
@@ -705,124 +1211,182 @@ class UnifiedConfig:
 
         # 添加表信息
         for table_name, table_schema in db_context.tables.items():
-            # 安全地提取列名
-            columns = table_schema.columns
-            if isinstance(columns, list):
-                if columns and isinstance(columns[0], dict):
-                    # 如果是字典列表，提取name字段
-                    column_names = [col.get('name', str(col)) for col in columns]
-                else:
-                    # 如果是字符串列表，直接使用
-                    column_names = [str(col) for col in columns]
-            else:
-                # 如果不是列表，转换为列表
-                column_names = [str(columns)]
-
+            columns = self._normalize_columns(table_schema.columns)
             self.schema_info[table_name] = {
-                'columns': column_names,
+                'columns': columns,
                 'description': table_schema.description,
                 'row_count': table_schema.row_count,
-                'key_fields': self._extract_key_fields_from_table(table_schema)
+                'key_fields': self._extract_key_fields(columns)
             }
 
         # 更新数据库类型
         self.database_type = db_context.database_type
 
-        print(f"[DEBUG] UnifiedConfig: 动态Schema加载成功")
-        print(f"  - 数据库类型: {self.database_type}")
-        print(f"  - 表数量: {len(db_context.tables)}")
+        logger.debug("动态Schema加载成功\n  - 数据库类型: %s\n  - 表数量: %s",
+                     self.database_type, len(db_context.tables))
+
+    def _get_schema_cache_path(self) -> str:
+        """生成Schema磁盘缓存文件路径（不同目录下的同名数据库互不冲突）"""
+        abs_path = os.path.abspath(self.database_path)
+        db_hash = hashlib.blake2b(abs_path.encode('utf-8'), digest_size=8).hexdigest()
+        db_name = os.path.splitext(os.path.basename(abs_path))[0]
+        return os.path.join(_SCHEMA_CACHE_DIR, f"{db_name}_{db_hash}.schema.json")
+
+    def _get_schema_cache_key(self) -> List[int]:
+        """Schema缓存键：数据库文件（及WAL文件）的mtime和大小"""
+        db_stat = os.stat(self.database_path)
+        key = [db_stat.st_mtime_ns, db_stat.st_size]
+        try:
+            wal_stat = os.stat(f"{self.database_path}-wal")
+            key += [wal_stat.st_mtime_ns, wal_stat.st_size]
+        except OSError:
+            pass
+        return key
+
+    def _load_schema_cache(self, cache_key: List[int]) -> Optional[dict]:
+        """读取Schema磁盘缓存（缓存键一致时有效）"""
+        try:
+            data = _load_json_file(self._get_schema_cache_path())
+            if data['key'] == cache_key:
+                return data['schema_info']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _save_schema_cache(self, cache_key: List[int], schema_info: dict):
+        """原子写入Schema磁盘缓存"""
+        cache_path = self._get_schema_cache_path()
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(_SCHEMA_CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': cache_key, 'schema_info': schema_info}, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("写入Schema缓存失败: %s", e)
 
     def _extract_sqlite_schema(self) -> dict:
-        """直接从SQLite数据库提取Schema信息"""
+        """直接从SQLite数据库提取Schema信息（优先读取磁盘缓存）"""
         try:
-            import sqlite3
+            cache_key = self._get_schema_cache_key()
+        except OSError:
+            return self._query_sqlite_schema()
+
+        schema_info = self._load_schema_cache(cache_key)
+        if schema_info is not None:
+            logger.info("从缓存加载Schema，包含 %s 个表", schema_info.get('total_tables', 0))
+            return schema_info
 
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
+        schema_info = self._query_sqlite_schema()
+        if schema_info:
+            self._save_schema_cache(cache_key, schema_info)
+        return schema_info
+
+    def _get_schema_connection(self) -> sqlite3.Connection:
+        """获取当前数据库的只读元数据连接（切换数据库或文件被替换后重建）"""
+        db_stat = os.stat(self.database_path)
+        conn_key = (self.database_path, db_stat.st_dev, db_stat.st_ino)
+        if self._schema_conn is None or self._schema_conn_key != conn_key:
+            self.close()
+            conn = sqlite3.connect(self.database_path, check_same_thread=False, cached_statements=128)
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-8000")
+            self._schema_conn = conn
+            self._schema_conn_key = conn_key
+        return self._schema_conn
+
+    def close(self):
+        """关闭缓存的数据库连接"""
+        if self._schema_conn is not None:
+            self._schema_conn.close()
+            self._schema_conn = None
+            self._schema_conn_key = None
+
+    def _query_sqlite_schema(self) -> dict:
+        """查询SQLite数据库的Schema信息"""
+        try:
+            cursor = self._get_schema_connection().cursor()
 
             schema_info = {
                 'database_type': 'sqlite',
                 'description': f'SQLite数据库: {os.path.basename(self.database_path)}'
             }
 
-            # 获取所有表
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-            tables = cursor.fetchall()
+            # 一次查询取回所有表的列信息（pragma表值函数），按表分组
+            cursor.execute(_SCHEMA_COLUMNS_QUERY)
+            table_columns: Dict[str, List[Dict[str, Any]]] = {}
+            for table_name, col_name, col_type, not_null, default_value, primary_key in cursor.fetchall():
+                table_columns.setdefault(table_name, []).append({
+                    'name': col_name,
+                    'type': col_type,
+                    'not_null': bool(not_null),
+                    'default_value': default_value,
+                    'primary_key': bool(primary_key)
+                })
+            tables = list(table_columns)
 
             schema_info['total_tables'] = len(tables)
 
-            for table_name_tuple in tables:
-                table_name = table_name_tuple[0]
-
-                # 获取表的列信息
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns_info = cursor.fetchall()
-
-                # 获取表的行数
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = cursor.fetchone()[0]
-
-                # 构建表信息
-                columns = []
-                for col_info in columns_info:
-                    columns.append({
-                        'name': col_info[1],
-                        'type': col_info[2],
-                        'not_null': bool(col_info[3]),
-                        'default_value': col_info[4],
-                        'primary_key': bool(col_info[5])
-                    })
-
+            # 行数统计合并为UNION ALL查询，避免逐表往返
+            row_counts: Dict[str, int] = {}
+            for start in range(0, len(tables), _ROW_COUNT_BATCH_SIZE):
+                batch = tables[start:start + _ROW_COUNT_BATCH_SIZE]
+                cursor.execute(" UNION ALL ".join(
+                    "SELECT ?, COUNT(*) FROM " + _quote_identifier(table_name) for table_name in batch
+                ), batch)
+                row_counts.update(cursor.fetchall())
+
+            for table_name, columns in table_columns.items():
+                row_count = row_counts[table_name]
                 schema_info[table_name] = {
                     'columns': columns,
                     'row_count': row_count,
                     'description': f'表 {table_name}，包含 {len(columns)} 列，{row_count} 行数据'
                 }
 
-            conn.close()
-
-            print(f"[INFO] UnifiedConfig: 直接提取Schema成功，包含 {len(tables)} 个表")
+            logger.info("直接提取Schema成功，包含 %s 个表", len(tables))
             return schema_info
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 直接Schema提取失败: {e}")
+            logger.exception("直接Schema提取失败: %s", e)
             return {}
 
-    def _extract_key_fields_from_table(self, table_schema) -> Dict[str, str]:
-        """从表结构中提取关键字段映射"""
+    @staticmethod
+    def _normalize_columns(columns) -> List[Dict[str, Any]]:
+        """统一列信息格式为带name键的字典列表（兼容字符串列表和单个值）"""
+        if not isinstance(columns, list):
+            columns = [columns]
+        normalized = []
+        for column in columns:
+            if isinstance(column, dict):
+                if 'name' not in column:
+                    column = {**column, 'name': str(column)}
+                normalized.append(column)
+            else:
+                normalized.append({'name': str(column)})
+        return normalized
+
+    def _extract_key_fields(self, columns: List[Dict[str, Any]]) -> Dict[str, str]:
+        """从已规范化的列信息中提取关键字段映射"""
         key_fields = {}
 
         try:
-            columns = table_schema.columns
-            if isinstance(columns, list):
-                for column in columns:
-                    # 安全地获取列名
-                    if isinstance(column, dict):
-                        col_name = column.get('name', str(column))
-                    else:
-                        col_name = str(column)
-
-                    col_lower = col_name.lower()
-
-                    # 识别关键字段类型
-                    if 'org' in col_lower and 'name' in col_lower:
-                        key_fields['branch_field'] = col_name
-                    elif col_name in ['CUST_ID', 'customer_id', 'cust_id']:
-                        key_fields['customer_id'] = col_name
-                    elif 'cust' in col_lower and 'name' in col_lower:
-                        key_fields['customer_name'] = col_name
-                    elif 'deposit' in col_lower and 'bal' in col_lower:
-                        key_fields['deposit_balance'] = col_name
-                    elif 'loan' in col_lower and 'bal' in col_lower:
-                        key_fields['loan_balance'] = col_name
+            for column in columns:
+                col_name = column['name']
+                # 识别关键字段类型（按规则顺序取第一个匹配）
+                for pattern, key in _FIELD_RULES:
+                    if pattern.match(col_name):
+                        key_fields[key] = col_name
+                        break
         except Exception as e:
-            print(f"[WARNING] 提取关键字段失败: {e}")
+            logger.warning("提取关键字段失败: %s", e)
 
         return key_fields
     
     def create_context(self, user_query: str) -> QueryContext:
         """为用户查询创建完整的上下文"""
-        print(f"[DEBUG] UnifiedConfig: 为查询创建上下文: {user_query}")
+        logger.debug("为查询创建上下文: %s", user_query)
         
         # 获取适用的查询范围规则
         applicable_rules = self._get_applicable_rules(user_query)
@@ -834,125 +1398,154 @@ class UnifiedConfig:
             business_terms=self.business_terms,
             schema_info=self.schema_info,
             query_scope_rules=applicable_rules,
-            table_relationships=self.table_relationships
+            table_relationships=self.table_relationships,
+            config_version=self._config_version,
+            term_matcher=self._get_term_matcher(),
+            schema_summary_text=self._get_schema_summary_text()
         )
         
-        print(f"[DEBUG] UnifiedConfig: 上下文创建完成")
+        logger.debug("上下文创建完成")
         return context
     
     def _get_applicable_rules(self, query: str) -> List[QueryScope]:
-        """获取适用于查询的范围规则"""
-        applicable_rules = []
-        for rule in self.query_scope_rules:
-            # 处理字典格式的规则
-            if isinstance(rule, dict):
-                query_pattern = rule.get('query_pattern', '')
-                if query_pattern and query_pattern in query:
-                    # 转换为QueryScope对象
-                    scope_rule = QueryScope(
-                        query_pattern=query_pattern,
-                        scope_type=rule.get('scope_type', 'filtered'),
-                        filter_conditions=rule.get('filter_conditions', ''),
-                        description=rule.get('description', '')
-                    )
-                    applicable_rules.append(scope_rule)
-            elif hasattr(rule, 'query_pattern'):
-                # 处理QueryScope对象
-                if rule.query_pattern in query:
-                    applicable_rules.append(rule)
-        return applicable_rules
+        """获取适用于查询的范围规则（按查询缓存扫描结果，结果保持规则定义顺序）"""
+        return list(_scan_rules(query, self._get_rule_index()))
+
+    def _get_rule_index(self) -> "RuleIndex":
+        """获取查询范围规则的模式索引（配置版本或规则列表变化后重建）"""
+        rules_source = self.query_scope_rules
+        key = (self._config_version, id(rules_source), len(rules_source))
+        if self._rule_index_key != key:
+            rules: List[QueryScope] = []
+            always_indexes = []
+            patterns: Dict[str, set] = {}
+            # 规则在赋值时已统一为QueryScope对象
+            for rule in rules_source:
+                if not hasattr(rule, 'query_pattern'):
+                    continue
+                index = len(rules)
+                rules.append(rule)
+                if rule.query_pattern:
+                    patterns.setdefault(rule.query_pattern, set()).add(index)
+                else:
+                    # 空模式与原子串判断一致：对所有查询都适用
+                    always_indexes.append(index)
+            self._rule_index = RuleIndex(tuple(rules), tuple(always_indexes), PatternIndex(patterns))
+            self._rule_index_key = key
+        return self._rule_index
     
+    def _database_exists(self) -> bool:
+        """检查当前数据库文件是否存在（按路径缓存1秒，避免热路径上的重复stat）"""
+        database_path = self.database_path
+        if not database_path:
+            return False
+        now = time.monotonic()
+        checked_at, path, exists = self._last_exists_check
+        if path != database_path or now - checked_at >= _EXISTS_CHECK_TTL:
+            exists = os.path.exists(database_path)
+            self._last_exists_check = (now, database_path, exists)
+        return exists
+
     def is_valid(self) -> bool:
         """检查配置是否有效"""
         # 🔧 修复：放宽验证条件，允许数据库切换后的临时状态
-        basic_valid = (
-            self.database_path is not None and
-            os.path.exists(self.database_path)
-        )
+        database_exists = self._database_exists()
+        basic_valid = self.database_path is not None and database_exists
 
         # 如果基础条件满足，即使business_terms为空也认为是有效的
         # 这允许数据库切换后的配置重新加载过程
         if basic_valid:
-            print(f"[DEBUG] UnifiedConfig.is_valid(): 基础验证通过")
-            print(f"  - 数据库路径: {self.database_path}")
-            print(f"  - 文件存在: {os.path.exists(self.database_path) if self.database_path else False}")
-            print(f"  - 业务术语数量: {len(self.business_terms)}")
+            logger.debug(
+                "UnifiedConfig.is_valid(): 基础验证通过\n  - 数据库路径: %s\n  - 文件存在: %s\n  - 业务术语数量: %s",
+                self.database_path, database_exists, len(self.business_terms)
+            )
             return True
 
-        print(f"[DEBUG] UnifiedConfig.is_valid(): 验证失败")
-        print(f"  - 数据库路径: {self.database_path}")
-        print(f"  - 文件存在: {os.path.exists(self.database_path) if self.database_path else False}")
+        logger.debug(
+            "UnifiedConfig.is_valid(): 验证失败\n  - 数据库路径: %s\n  - 文件存在: %s",
+            self.database_path, database_exists
+        )
         return False
     
     def get_status(self) -> Dict[str, Any]:
         """获取配置状态"""
+        is_valid = self.is_valid()
+        # 计数部分只随配置版本变化；文件存在性与有效性每次实时检查
+        if self._status_counts_version != self._config_version:
+            self._status_counts = {
+                'business_terms_count': len(self.business_terms),
+                'query_rules_count': len(self.query_scope_rules),
+                'field_mappings_count': len(self.field_mappings),
+                'table_relationships_count': len(self.table_relationships),
+            }
+            self._status_counts_version = self._config_version
         return {
             'database_path': self.database_path,
-            'database_exists': os.path.exists(self.database_path) if self.database_path else False,
+            'database_exists': self._database_exists(),
             'database_type': self.database_type,
-            'business_terms_count': len(self.business_terms),
-            'query_rules_count': len(self.query_scope_rules),
-            'field_mappings_count': len(self.field_mappings),
-            'table_relationships_count': len(self.table_relationships),
-            'is_valid': self.is_valid(),
+            **self._status_counts,
+            'is_valid': is_valid,
             'config_consistency': self._check_consistency()
         }
 
-    def _load_field_mappings(self):
+    def _load_field_mappings(self, force: bool = False):
         """加载统一字段映射 - 优先从数据库特定上下文加载"""
+        source_key = self._source_key('field_mappings', force)
+        if source_key is None:
+            return
+
         try:
             # 如果有数据库路径，优先从数据库特定上下文加载字段映射
             if self.database_path:
-                print(f"[DEBUG] UnifiedConfig: 加载字段映射")
+                logger.debug("加载字段映射")
 
                 # 尝试从智能上下文管理器加载
                 try:
-                    from .intelligent_context_manager import get_context_manager
-                    context_manager = get_context_manager()
+                    context_manager = _ctx_mgr()
                     db_context = context_manager.get_or_create_context(self.database_path)
 
-                    # 将DatabaseContext对象转换为字典格式
-                    db_context_data = None
                     if db_context:
-                        db_context_data = {
-                            'database_specific_field_mappings': getattr(db_context, 'database_specific_field_mappings', None),
-                            'field_mappings': getattr(db_context, 'field_mappings', {})
-                        }
+                        # DatabaseContext可能来自旧版本，缺少字段时按空映射处理
+                        specific_mappings = getattr(db_context, 'database_specific_field_mappings', None)
+                        if specific_mappings:
+                            # 从数据库特定上下文加载字段映射
+                            self.field_mappings = specific_mappings
+                            logger.debug("从数据库特定上下文加载字段映射 %s 个", len(self.field_mappings))
+                            self._mark_loaded('field_mappings', source_key)
+                            return
 
-                    if db_context_data and 'database_specific_field_mappings' in db_context_data:
-                        # 从数据库特定上下文加载字段映射
-                        self.field_mappings = db_context_data['database_specific_field_mappings']
-                        print(f"[DEBUG] UnifiedConfig: 从数据库特定上下文加载字段映射 {len(self.field_mappings)} 个")
-                        return
-                    elif db_context_data and 'field_mappings' in db_context_data:
                         # 回退到原有的字段映射
-                        self.field_mappings = db_context_data['field_mappings']
-                        print(f"[DEBUG] UnifiedConfig: 从数据库上下文加载原有字段映射 {len(self.field_mappings)} 个")
+                        self.field_mappings = getattr(db_context, 'field_mappings', None) or {}
+                        logger.debug("从数据库上下文加载原有字段映射 %s 个", len(self.field_mappings))
+                        self._mark_loaded('field_mappings', source_key)
                         return
 
                 except ImportError:
-                    print(f"[DEBUG] UnifiedConfig: 智能上下文管理器不可用，使用基础字段映射")
+                    logger.debug("智能上下文管理器不可用，使用基础字段映射")
 
-                # 使用基础字段映射配置，但保留已有的映射
-                if not hasattr(self, 'field_mappings') or not self.field_mappings:
+                # 使用基础字段映射配置，但保留已有的映射（__init__中已初始化为空字典）
+                if not self.field_mappings:
                     self.field_mappings = {}
-                print(f"[DEBUG] UnifiedConfig: 使用基础字段映射配置，当前有 {len(self.field_mappings)} 个映射")
+                logger.debug("使用基础字段映射配置，当前有 %s 个映射", len(self.field_mappings))
             else:
-                print(f"[DEBUG] UnifiedConfig: 无数据库路径，使用空字段映射配置")
+                logger.debug("无数据库路径，使用空字段映射配置")
                 self.field_mappings = {}
 
-            print(f"[DEBUG] UnifiedConfig: 字段映射加载完成，共 {len(self.field_mappings)} 个")
+            logger.debug("字段映射加载完成，共 %s 个", len(self.field_mappings))
+            self._mark_loaded('field_mappings', source_key)
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 字段映射加载失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("字段映射加载失败: %s", e)
             self.field_mappings = {}
 
-    def _load_table_relationships(self):
+    def _load_table_relationships(self, force: bool = False):
         """加载表关系配置 - 基于当前数据库的实际表结构"""
+        source_key = self._source_key('table_relationships', force, self._context_config_path())
+        if source_key is None:
+            return
+
         try:
             if not self.database_path or not self.schema_info:
-                print("[DEBUG] UnifiedConfig: 无数据库路径或Schema信息，跳过表关系加载")
+                logger.debug("无数据库路径或Schema信息，跳过表关系加载")
                 self.table_relationships = {}
                 return
 
@@ -961,35 +1554,26 @@ class UnifiedConfig:
 
             # 从配置文件加载表关系
             if self._load_table_relationships_from_config():
-                print(f"[INFO] UnifiedConfig: 从配置文件加载表关系 {len(self.table_relationships)} 个")
+                logger.info("从配置文件加载表关系 %s 个", len(self.table_relationships))
             else:
                 # 基于当前数据库的实际表结构动态生成表关系
                 self._generate_table_relationships_from_schema()
-                print(f"[DEBUG] UnifiedConfig: 基于Schema生成表关系 {len(self.table_relationships)} 个")
+                logger.debug("基于Schema生成表关系 %s 个", len(self.table_relationships))
+
+            self._mark_loaded('table_relationships', source_key)
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 表关系加载失败: {e}")
+            logger.exception("表关系加载失败: %s", e)
             self.table_relationships = {}
 
     def _load_table_relationships_from_config(self) -> bool:
         """从配置文件加载表关系"""
         try:
-            import json
-            import glob
-
             # 根据数据库路径确定配置文件
-            db_name = os.path.splitext(os.path.basename(self.database_path))[0]
-            config_pattern = f"configs/database_contexts/{db_name}_context.json"
-
-            config_files = glob.glob(config_pattern)
-            if not config_files:
+            config_data = _load_context_config(self._context_config_path())
+            if config_data is None:
                 return False
 
-            config_file = config_files[0]
-
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-
             # 从database_description中加载表关系
             db_description = config_data.get('database_description', {})
             table_relationships = db_description.get('table_relationships', [])
@@ -1009,20 +1593,19 @@ class UnifiedConfig:
             return len(self.table_relationships) > 0
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 从配置文件加载表关系失败: {e}")
+            logger.exception("从配置文件加载表关系失败: %s", e)
             return False
 
     def _generate_table_relationships_from_schema(self):
         """基于Schema生成表关系"""
         # 获取当前数据库的表列表（排除元数据字段）
-        actual_tables = [k for k in self.schema_info.keys()
-                       if k not in ['description', 'database_type', 'total_tables']]
+        actual_tables = _schema_tables(self.schema_info)
 
-        print(f"[DEBUG] UnifiedConfig: 当前数据库表: {actual_tables}")
+        logger.debug("当前数据库表: %s", actual_tables)
 
         # 如果是banking_indicators单表数据库，不需要表关系
         if len(actual_tables) == 1 and 'banking_indicators' in actual_tables:
-            print("[DEBUG] UnifiedConfig: 单表数据库，无需表关系配置")
+            logger.debug("单表数据库，无需表关系配置")
             self.table_relationships = {}
 
         # 如果是多表数据库，根据实际表结构定义关系
@@ -1050,176 +1633,121 @@ class UnifiedConfig:
         """自动配置缺失的字段映射，基于数据库实际结构"""
         try:
             if not self.database_path or not self.schema_info:
-                print("[DEBUG] UnifiedConfig: 无数据库信息，跳过自动字段映射配置")
+                logger.debug("无数据库信息，跳过自动字段映射配置")
                 return
 
-            print("[DEBUG] UnifiedConfig: 开始自动配置字段映射...")
+            logger.debug("开始自动配置字段映射...")
 
             # 获取数据库中的实际字段
-            actual_fields = set()
-            for table_name, table_info in self.schema_info.items():
-                if table_name not in ['description', 'database_type', 'total_tables']:
-                    if isinstance(table_info, dict) and 'columns' in table_info:
-                        for column in table_info['columns']:
-                            if isinstance(column, dict) and 'name' in column:
-                                actual_fields.add(column['name'])
-                            elif isinstance(column, str):
-                                actual_fields.add(column)
-
-            print(f"[DEBUG] UnifiedConfig: 发现数据库字段: {sorted(actual_fields)}")
-
-            # 定义关键字段的自动映射规则
-            auto_mapping_rules = {
-                'host_org_name': ['host_org_name', 'BRANCH_NAME', 'acg_org_blng_lv1_branch_name', 'org_name', 'branch'],
-                'CUST_ID': ['CUST_ID', 'cust_id', 'customer_id', 'cust_no', 'CUST_NO'],
-                'corp_deposit_y_avg_bal': ['corp_deposit_y_avg_bal', 'avg_deposit', 'yearly_avg_balance', 'deposit_avg'],
-                'CUST_NAME': ['CUST_NAME', 'cust_name', 'customer_name', 'name'],
-                'corp_deposit_bal': ['corp_deposit_bal', 'deposit_balance', 'current_balance'],
-                'loan_bal_rmb': ['loan_bal_rmb', 'loan_balance', 'loan_bal'],
-                'CONTRACT_CL_RESULT': ['CONTRACT_CL_RESULT', 'classification_result', 'cl_result']
-            }
+            actual_fields = _schema_field_names(self.schema_info)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("发现数据库字段: %s", sorted(actual_fields))
+
+            # 一次扫描实际字段，为每个逻辑字段选出优先级最高的候选
+            best_matches: Dict[str, Tuple[int, str]] = {}
+            for actual_field in actual_fields:
+                for logical_field, rank in _AUTO_MAPPING_CANDIDATES.get(actual_field, ()):
+                    current = best_matches.get(logical_field)
+                    if current is None or rank < current[0]:
+                        best_matches[logical_field] = (rank, actual_field)
 
-            # 自动匹配字段
+            # 自动匹配字段（按规则顺序写入，保持日志顺序）
             auto_mapped_count = 0
-            for logical_field, possible_names in auto_mapping_rules.items():
+            for logical_field in _AUTO_MAPPING_RULES:
                 if logical_field not in self.field_mappings:
-                    # 查找匹配的实际字段
-                    for possible_name in possible_names:
-                        if possible_name in actual_fields:
-                            self.field_mappings[logical_field] = possible_name
-                            auto_mapped_count += 1
-                            print(f"[INFO] UnifiedConfig: 自动映射 {logical_field} -> {possible_name}")
-                            break
-
-                    if logical_field not in self.field_mappings:
-                        print(f"[WARNING] UnifiedConfig: 未找到字段 {logical_field} 的匹配")
+                    match = best_matches.get(logical_field)
+                    if match is not None:
+                        self.field_mappings[logical_field] = match[1]
+                        auto_mapped_count += 1
+                        logger.info("自动映射 %s -> %s", logical_field, match[1])
+                    else:
+                        logger.warning("未找到字段 %s 的匹配", logical_field)
 
-            print(f"[INFO] UnifiedConfig: 自动配置了 {auto_mapped_count} 个字段映射")
+            logger.info("自动配置了 %s 个字段映射", auto_mapped_count)
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 自动字段映射配置失败: {e}")
+            logger.exception("自动字段映射配置失败: %s", e)
 
     def _validate_config_consistency(self):
         """验证配置一致性"""
-        print("[DEBUG] UnifiedConfig: 验证配置一致性...")
+        logger.debug("验证配置一致性...")
 
         # 验证关键字段映射
         critical_fields = ["host_org_name", "CUST_ID", "corp_deposit_y_avg_bal"]
-        for field in critical_fields:
-            if field not in self.field_mappings:
-                print(f"[WARNING] 关键字段 {field} 缺失映射配置")
+        for field_name in critical_fields:
+            if field_name not in self.field_mappings:
+                logger.warning("关键字段 %s 缺失映射配置", field_name)
 
-        print("[DEBUG] UnifiedConfig: 配置一致性验证完成")
+        logger.debug("配置一致性验证完成")
 
     def _check_consistency(self) -> bool:
-        """检查配置一致性"""
-        try:
-            # 检查关键配置项
-            if not self.database_path or not self.business_terms:
-                return False
-
-            # 检查字段映射完整性
-            critical_fields = ["host_org_name", "CUST_ID"]
-            for field in critical_fields:
-                if field not in self.field_mappings:
-                    return False
-
-            return True
-        except Exception:
-            return False
-
-    def get_nl2sql_config(self, database_type: str = None) -> Dict[str, Any]:
-        """获取NL2SQL配置"""
-        try:
-            if database_type is None:
-                database_type = self.database_type
-
-            # 从database_contexts获取NL2SQL配置
-            # 简化：直接使用第一个匹配的数据库类型配置
-            context = {}
-            for key, config in self.database_contexts.items():
-                if database_type in key:
-                    context = config
-                    break
-            nl2sql_config = context.get('nl2sql_config', {})
-
-            if not nl2sql_config:
-                print(f"[WARNING] 未找到数据库类型 {database_type} 的NL2SQL配置，使用默认配置")
-                nl2sql_config = self._get_default_nl2sql_config()
+        """检查配置一致性（结果按配置版本及相关配置的标识缓存）"""
+        database_path = self.database_path
+        business_terms = self.business_terms
+        field_mappings = self.field_mappings
+        key = (self._config_version, database_path, id(business_terms), len(business_terms),
+               id(field_mappings), len(field_mappings))
+        if self._consistency_key == key:
+            return self._consistency_result
+
+        # 检查关键配置项（由便宜到昂贵），再检查字段映射完整性
+        result = bool(
+            database_path
+            and business_terms
+            and _CONSISTENCY_CRITICAL_FIELDS.issubset(field_mappings.keys())
+        )
+        self._consistency_key = key
+        self._consistency_result = result
+        return result
 
-            return nl2sql_config
+    def _get_default_nl2sql_config(self) -> Mapping[str, Any]:
+        """获取默认NL2SQL配置（共享只读实例，需要修改时由调用方复制）"""
+        return _DEFAULT_NL2SQL_CONFIG
 
-        except Exception as e:
-            print(f"[ERROR] 获取NL2SQL配置失败: {e}")
-            return self._get_default_nl2sql_config()
+    def create_query_context_for_nl2sql(self, query: str) -> Dict[str, Any]:
+        """为NL2SQL创建查询上下文（异常由调用方统一处理）"""
+        logger.debug("为NL2SQL创建查询上下文: %s", query)
 
-    def _get_default_nl2sql_config(self) -> Dict[str, Any]:
-        """获取默认NL2SQL配置"""
-        return {
-            "prompt_templates": {
-                "default": "你是一个专业的SQL生成专家。请基于以下信息生成SQL查询：\n\n用户查询：{user_query}\n\n请生成SQL语句："
+        context = {
+            "database_info": {
+                "path": self.database_path,
+                "type": self.database_type
             },
-            "sql_generation_rules": {
-                "constraints": {
-                    "forbidden_time_filters": [],
-                    "forbidden_reason": ""
-                }
-            },
-            "query_type_mapping": {
-                "patterns": [
-                    {
-                        "pattern": ".*",
-                        "type": "simple_query",
-                        "complexity": "simple",
-                        "priority": 1
-                    }
-                ]
-            }
+            "business_terms": self.business_terms,
+            "field_mappings": self.field_mappings,
+            "table_relationships": self.table_relationships,
+            "user_query": query,
+            "database_schema": self._build_schema_summary()
         }
 
-    def create_query_context_for_nl2sql(self, query: str) -> Dict[str, Any]:
-        """为NL2SQL创建查询上下文"""
-        try:
-            print(f"[DEBUG] UnifiedConfig: 为NL2SQL创建查询上下文: {query}")
-
-            context = {
-                "database_info": {
-                    "path": self.database_path,
-                    "type": self.database_type
-                },
-                "business_terms": self.business_terms,
-                "field_mappings": self.field_mappings,
-                "table_relationships": self.table_relationships,
-                "user_query": query,
-                "database_schema": self._build_schema_summary()
-            }
-
-            print(f"[DEBUG] UnifiedConfig: NL2SQL查询上下文创建完成")
-            return context
-
-        except Exception as e:
-            print(f"[ERROR] UnifiedConfig: 创建NL2SQL查询上下文失败: {e}")
-            return {"user_query": query}
+        logger.debug("NL2SQL查询上下文创建完成")
+        return context
 
     def _build_schema_summary(self) -> str:
-        """构建数据库结构摘要"""
-        try:
-            schema_parts = []
+        """构建数据库结构摘要（按配置版本缓存）"""
+        if self._nl2sql_schema_summary_version == self._config_version:
+            return self._nl2sql_schema_summary
 
+        try:
+            schema_summary = ""
             # 添加表关系信息
             if self.table_relationships:
-                schema_parts.append("【表关系】")
-                for rel_name, rel_info in self.table_relationships.items():
-                    from_table = rel_info.get('from_table', '')
-                    to_table = rel_info.get('to_table', '')
-                    from_field = rel_info.get('from_field', '')
-                    to_field = rel_info.get('to_field', '')
-                    schema_parts.append(f"- {from_table}.{from_field} = {to_table}.{to_field}")
+                schema_summary = "\n".join([
+                    "【表关系】",
+                    *(
+                        f"- {rel_info.get('from_table', '')}.{rel_info.get('from_field', '')} = "
+                        f"{rel_info.get('to_table', '')}.{rel_info.get('to_field', '')}"
+                        for rel_info in self.table_relationships.values()
+                    )
+                ])
 
-            return "\n".join(schema_parts)
+            self._nl2sql_schema_summary = schema_summary
+            self._nl2sql_schema_summary_version = self._config_version
+            return schema_summary
 
         except Exception as e:
-            print(f"[ERROR] 构建数据库结构摘要失败: {e}")
+            logger.exception("构建数据库结构摘要失败: %s", e)
             return ""
 
     def create_query_context(self, query: str, database_path: str = None) -> 'QueryContext':
@@ -1230,44 +1758,25 @@ class UnifiedConfig:
 
             # 如果数据库路径不匹配，需要切换
             if db_path and db_path != self.database_path:
-                print(f"[INFO] 切换数据库上下文: {db_path}")
+                logger.info("切换数据库上下文: %s", db_path)
                 self.switch_database(db_path)
 
-            # 转换业务术语格式
-            business_terms = {}
-            for term_name, term_data in self.business_terms.items():
-                if isinstance(term_data, dict):
-                    business_terms[term_name] = BusinessTerm(
-                        name=term_data.get('name', term_name),
-                        definition=term_data.get('definition', ''),
-                        data_representation=term_data.get('sql_conditions', ''),
-                        sql_conditions=term_data.get('sql_conditions', ''),
-                        examples=term_data.get('examples', [])
-                    )
-
-            # 转换查询范围规则格式
-            scope_rules = []
-            for rule_data in self.query_scope_rules:
-                if isinstance(rule_data, dict):
-                    scope_rules.append(QueryScope(
-                        query_pattern=rule_data.get('query_pattern', ''),
-                        scope_type=rule_data.get('scope_type', 'all'),
-                        filter_conditions=rule_data.get('filter_conditions', ''),
-                        description=rule_data.get('description', '')
-                    ))
-
+            # 业务术语和查询范围规则在加载/赋值时已统一为BusinessTerm/QueryScope对象，直接共享引用
             return QueryContext(
                 user_query=query,
                 database_path=self.database_path or '',
                 database_type=self.database_type or 'unknown',
-                business_terms=business_terms,
+                business_terms=self.business_terms,
                 schema_info=self.schema_info,
-                query_scope_rules=scope_rules,
-                table_relationships=self.table_relationships
+                query_scope_rules=self.query_scope_rules,
+                table_relationships=self.table_relationships,
+                config_version=self._config_version,
+                term_matcher=self._get_term_matcher(),
+                schema_summary_text=self._get_schema_summary_text()
             )
 
         except Exception as e:
-            print(f"[ERROR] 创建查询上下文失败: {e}")
+            logger.exception("创建查询上下文失败: %s", e)
             # 返回最小化的上下文
             return QueryContext(
                 user_query=query,
@@ -1281,8 +1790,9 @@ class UnifiedConfig:
 
     def _load_nl2sql_config(self):
         """🔥 新增：加载NL2SQL配置 - 统一管理所有NL2SQL相关配置"""
+        self._nl2sql_config_view = None
         try:
-            print("[DEBUG] UnifiedConfig: 开始加载NL2SQL配置...")
+            logger.debug("开始加载NL2SQL配置...")
 
             # 默认NL2SQL配置
             self.nl2sql_config = {
@@ -1351,6 +1861,8 @@ class UnifiedConfig:
                 }
             ]
 
+            _compile_query_patterns(self.query_patterns)
+
             # 默认SQL约束
             self.sql_constraints = {
                 "forbidden_time_filters": [
@@ -1363,31 +1875,31 @@ class UnifiedConfig:
                 "forbidden_operations": ["DROP", "DELETE", "UPDATE", "INSERT"]
             }
 
-            print(f"[DEBUG] UnifiedConfig: NL2SQL配置加载完成")
-            print(f"  - 提示词模板: {len(self.prompt_templates)} 个")
-            print(f"  - 查询模式: {len(self.query_patterns)} 个")
-            print(f"  - 约束规则: {len(self.sql_constraints)} 个")
+            logger.debug("NL2SQL配置加载完成\n  - 提示词模板: %s 个\n  - 查询模式: %s 个\n  - 约束规则: %s 个",
+                         len(self.prompt_templates), len(self.query_patterns), len(self.sql_constraints))
 
         except Exception as e:
-            print(f"[WARNING] UnifiedConfig: NL2SQL配置加载失败: {e}")
+            logger.warning("NL2SQL配置加载失败: %s", e)
             # 设置最小配置
             self.nl2sql_config = {"engine_type": "simple"}
             self.prompt_templates = {}
             self.query_patterns = []
             self.sql_constraints = {}
 
-    def get_nl2sql_config(self) -> Dict[str, Any]:
-        """获取NL2SQL配置"""
-        return {
-            "engine_config": self.nl2sql_config,
-            "prompt_templates": self.prompt_templates,
-            "query_type_mapping": {
-                "patterns": self.query_patterns
-            },
-            "sql_generation_rules": {
-                "constraints": self.sql_constraints
-            }
-        }
+    def get_nl2sql_config(self) -> Mapping[str, Any]:
+        """获取NL2SQL配置（只读视图，配置加载或更新前复用同一实例）"""
+        if self._nl2sql_config_view is None:
+            self._nl2sql_config_view = MappingProxyType({
+                "engine_config": self.nl2sql_config,
+                "prompt_templates": self.prompt_templates,
+                "query_type_mapping": {
+                    "patterns": self.query_patterns
+                },
+                "sql_generation_rules": {
+                    "constraints": self.sql_constraints
+                }
+            })
+        return self._nl2sql_config_view
 
     def update_nl2sql_config(self, config_updates: Dict[str, Any]):
         """更新NL2SQL配置"""
@@ -1396,49 +1908,80 @@ class UnifiedConfig:
                 self.prompt_templates.update(config_updates["prompt_templates"])
 
             if "query_patterns" in config_updates:
-                self.query_patterns.extend(config_updates["query_patterns"])
+                # 先编译再追加，正则无效时不影响已有模式
+                self.query_patterns.extend(_compile_query_patterns(config_updates["query_patterns"]))
 
             if "sql_constraints" in config_updates:
                 self.sql_constraints.update(config_updates["sql_constraints"])
 
-            print("[DEBUG] UnifiedConfig: NL2SQL配置更新完成")
+            self._nl2sql_config_view = None
+            logger.debug("NL2SQL配置更新完成")
 
         except Exception as e:
-            print(f"[ERROR] UnifiedConfig: NL2SQL配置更新失败: {e}")
+            logger.exception("NL2SQL配置更新失败: %s", e)
 
 
 # 全局统一配置实例
 _global_unified_config = None
+_global_unified_config_lock = threading.Lock()
 
 def get_unified_config() -> UnifiedConfig:
-    """获取全局统一配置实例"""
+    """获取全局统一配置实例（双重检查加锁，并发首次访问时只创建一个实例）"""
     global _global_unified_config
-    if _global_unified_config is None:
-        _global_unified_config = UnifiedConfig()
-    return _global_unified_config
+    config = _global_unified_config
+    if config is None:
+        with _global_unified_config_lock:
+            config = _global_unified_config
+            if config is None:
+                config = _global_unified_config = UnifiedConfig()
+    return config
 
 def reload_unified_config():
     """重新加载全局统一配置"""
     global _global_unified_config
-    print("[DEBUG] 重新加载全局统一配置...")
-    _global_unified_config = None
-    _global_unified_config = UnifiedConfig()
-    print("[DEBUG] 全局统一配置重新加载完成")
-    return _global_unified_config
+    logger.debug("重新加载全局统一配置...")
+    new_config = UnifiedConfig()
+    with _global_unified_config_lock:
+        old_config, _global_unified_config = _global_unified_config, new_config
+    if old_config is not None:
+        old_config.close()
+    logger.debug("全局统一配置重新加载完成")
+    return new_config
 
 def update_global_config_database(database_path: str):
     """更新全局配置的数据库路径"""
-    global _global_unified_config
-    if _global_unified_config is not None:
-        print(f"[DEBUG] 更新全局配置数据库路径: {database_path}")
-        _global_unified_config.database_path = database_path
+    config = _global_unified_config
+    if config is not None:
+        config._ensure_configs_loaded()
+        # 路径相同且数据库文件未变化时无需重新加载
+        source_key = (database_path, _path_mtime(database_path))
+        if config.database_path == database_path and config._global_update_key == source_key:
+            logger.debug("全局配置数据库未变化，跳过更新: %s", database_path)
+            return
+
+        logger.debug("更新全局配置数据库路径: %s", database_path)
+        config.database_path = database_path
         # 重新加载相关配置
-        _global_unified_config._load_schema_info()
-        _global_unified_config._load_field_mappings()
-        _global_unified_config._load_table_relationships()
-        print("[DEBUG] 全局配置数据库更新完成")
+        config._load_schema_info()
+        config._load_field_mappings()
+        config._load_table_relationships()
+        # 版本号变化会同时使术语匹配器、规则索引、结构摘要等派生缓存失效
+        config._bump_config_version()
+        config._global_update_key = source_key
+        logger.debug("全局配置数据库更新完成")
 
 def reset_unified_config():
     """重置全局统一配置实例"""
     global _global_unified_config
-    _global_unified_config = None
+    with _global_unified_config_lock:
+        old_config, _global_unified_config = _global_unified_config, None
+    if old_config is not None:
+        old_config.close()
+
+
+# 智能上下文管理器为可选模块，在模块末尾导入一次：
+# 该模块若反向导入本模块，此时所需名称均已定义，不会因循环导入失败
+try:
+    from .intelligent_context_manager import get_context_manager as _get_context_manager
+except ImportError as e:
+    _CTX_MGR_IMPORT_ERROR = str(e)
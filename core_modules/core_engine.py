@@ -7,12 +7,341 @@ DataProxy 统一核心引擎
 """
 
 import os
+import re
+import json
 import time
+import logging
 import sqlite3
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 语义缓存的本地向量模型（可选，缺失时退化为按查询文本精确匹配）
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# 缓存键的快速哈希（可选，缺失时回退到hashlib）
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+# 所有表的列信息（按表定义顺序和列顺序）
+_SCHEMA_COLUMNS_QUERY = (
+    "SELECT m.name, p.name, p.type, p.\"notnull\", p.pk "
+    "FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p "
+    "WHERE m.type = 'table' "
+    "ORDER BY m.rowid, p.cid"
+)
+
+# LLM响应中的SQL代码块
+_SQL_FENCE = re.compile(r"```sql(.*?)(?:```|\Z)", re.S | re.I)
+_CODE_FENCE = re.compile(r"```(.*?)(?:```|\Z)", re.S)
+
+# 查询结果分析（统计、洞察、可视化）使用的后台线程池
+_ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dataproxy-analysis")
+
+# 本地向量模型（语义缓存与Schema筛选共用，查询以中文为主，使用多语言模型）
+_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+_embedding_models: Dict[str, Any] = {}
+_embedding_models_lock = threading.Lock()
+
+# Schema筛选用的表向量: (数据库路径, Schema哈希) -> (表名列表, 向量矩阵)，同一数据库的各引擎实例共用
+_table_embeddings: Dict[Tuple[str, str], tuple] = {}
+_table_embeddings_lock = threading.Lock()
+
+
+def _get_embedding_model(model_name: str):
+    """获取共享的向量模型（首次使用时加载，模型不可用时返回None）"""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        return None
+    with _embedding_models_lock:
+        model = _embedding_models.get(model_name)
+        if model is None:
+            try:
+                model = SentenceTransformer(model_name)
+            except Exception as e:
+                logger.warning("向量模型加载失败，相关功能退化: %s", e)
+                model = False
+            _embedding_models[model_name] = model
+    return model or None
+
+
+def _embed_texts(texts: List[str], model_name: str = _EMBEDDING_MODEL):
+    """计算归一化向量矩阵（模型不可用时返回None）"""
+    model = _get_embedding_model(model_name)
+    if model is None:
+        return None
+    vectors = model.encode(texts, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+@lru_cache(maxsize=256)
+def _embed_query(text: str, model_name: str = _EMBEDDING_MODEL):
+    """计算单条查询的归一化向量（语义缓存查找与Schema筛选对同一查询只计算一次）"""
+    vectors = _embed_texts([text], model_name)
+    return None if vectors is None else vectors[0]
+
+
+def _get_table_embeddings(database_path: str, schema_hash: str, schema_info: Dict[str, Any]) -> tuple:
+    """获取每个表“表名: 字段列表”描述的向量（按数据库路径和Schema哈希缓存，模型不可用时向量为None）"""
+    cache_key = (database_path, schema_hash)
+    with _table_embeddings_lock:
+        cached = _table_embeddings.get(cache_key)
+        if cached is None:
+            table_names = list(schema_info)
+            descriptions = [
+                f"{table_name}: {', '.join(col['name'] for col in schema_info[table_name]['columns'])}"
+                for table_name in table_names
+            ]
+            cached = (table_names, _embed_texts(descriptions))
+            _table_embeddings[cache_key] = cached
+    return cached
+
+
+# 大结果集数值汇总的JIT内核（可选，缺失时使用pandas汇总）
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# 数值单元格数超过该值时使用JIT内核（小结果集使用pandas，避免内核调度开销）
+_NUMBA_MIN_CELLS = 1_000_000
+
+# 行数超过该值的结果集，可视化数据表只取固定种子的随机样本（统计和洞察仍按全量精确计算）
+_VIZ_SAMPLE_MIN_ROWS = 50_000
+_VIZ_SAMPLE_SIZE = 10_000
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _column_stats_kernel(values):
+        """一次遍历计算每列的count/sum/mean/min/max（忽略NaN），返回5×列数矩阵"""
+        n_rows, n_cols = values.shape
+        out = np.empty((5, n_cols))
+        for j in prange(n_cols):
+            count = 0
+            total = 0.0
+            low = np.inf
+            high = -np.inf
+            for i in range(n_rows):
+                v = values[i, j]
+                if not np.isnan(v):
+                    count += 1
+                    total += v
+                    if v < low:
+                        low = v
+                    if v > high:
+                        high = v
+            out[0, j] = count
+            out[1, j] = total
+            if count > 0:
+                out[2, j] = total / count
+                out[3, j] = low
+                out[4, j] = high
+            else:
+                out[2, j] = np.nan
+                out[3, j] = np.nan
+                out[4, j] = np.nan
+        return out
+
+
+# SQL解析，用于识别只读查询并规范化结果缓存键（可选，缺失时按语句前缀判断）
+try:
+    import sqlglot
+    from sqlglot import exp as sqlglot_exp
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+
+# DEBUG日志中的提示词token估算（可选，缺失时不统计；DeepSeek分词器未公开，使用tiktoken编码近似，仅在DEBUG级别首次统计时加载）
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+_PROMPT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_prompt_encoder():
+    """获取提示词分词器（首次调用时加载，可能需要联网下载编码；不可用时返回None）"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(_PROMPT_ENCODING)
+    except Exception as e:
+        logger.warning("提示词分词器加载失败: %s", e)
+        return None
+
+
+def _fingerprint(text: str) -> str:
+    """计算字符串的稳定哈希（用于Schema指纹和缓存键，跨进程一致）"""
+    data = text.encode('utf-8')
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class SemanticCache:
+    """
+    NL2SQL语义缓存
+
+    按查询语句的向量相似度复用已生成的SQL，命中时跳过LLM调用：
+    - 相似度 >= hit_threshold：直接复用缓存的SQL
+    - verify_threshold <= 相似度 < hit_threshold：由调用方确认两个查询等价后复用
+    缓存只保存SQL，不保存结果数据（数据可能已变化，命中后仍重新执行SQL）。
+    条目按Schema哈希隔离，Schema变化后旧条目不再命中。
+    """
+
+    def __init__(self, cache_path: str, schema_hash: str, model_name: str = _EMBEDDING_MODEL,
+                 hit_threshold: float = 0.98, verify_threshold: float = 0.90,
+                 max_entries: int = 1000):
+        self.cache_path = cache_path
+        self.schema_hash = schema_hash
+        self.model_name = model_name
+        self.hit_threshold = hit_threshold
+        self.verify_threshold = verify_threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, str]] = []  # [{'query', 'sql'}]
+        self._vectors = None  # 归一化向量矩阵，行与_entries一一对应
+        self._exact: Dict[str, str] = {}  # 规范化查询文本 -> SQL
+        self._load()
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return "".join(query.split())
+
+    def _embed(self, texts: List[str]):
+        return _embed_texts(texts, self.model_name)
+
+    def lookup(self, query: str, confirm=None) -> Optional[str]:
+        """
+        查找可复用的SQL
+
+        Args:
+            query: 用户查询
+            confirm: 可选回调confirm(query, cached_query) -> bool，用于确认中等相似度的命中
+
+        Returns:
+            命中时返回缓存的SQL，否则返回None
+        """
+        with self._lock:
+            sql = self._exact.get(self._normalize(query))
+            if sql is not None or not self._entries:
+                return sql
+            vectors = self._vectors
+            entries = self._entries
+
+        if vectors is None or len(vectors) != len(entries):
+            return None
+        query_vector = _embed_query(query, self.model_name)
+        if query_vector is None:
+            return None
+
+        # 向量已归一化，内积即余弦相似度
+        scores = vectors @ query_vector
+        best = int(scores.argmax())
+        score = float(scores[best])
+        entry = entries[best]
+        if score >= self.hit_threshold:
+            return entry['sql']
+        if score >= self.verify_threshold and confirm is not None and confirm(query, entry['query']):
+            return entry['sql']
+        return None
+
+    def put(self, query: str, sql: str):
+        """写入查询与SQL的对应关系并持久化"""
+        vector = _embed_query(query, self.model_name)
+        if vector is not None:
+            vector = vector[np.newaxis, :]
+        with self._lock:
+            key = self._normalize(query)
+            if key in self._exact:
+                return
+            self._exact[key] = sql
+            self._entries.append({'query': query, 'sql': sql})
+            # 向量矩阵的行必须与_entries一一对应：无法计算新条目的向量时整体丢弃向量（仅保留精确匹配），
+            # 之后模型可用时再为全部条目重新计算
+            if vector is None:
+                self._vectors = None
+            elif self._vectors is not None:
+                self._vectors = np.vstack([self._vectors, vector])
+            elif len(self._entries) == 1:
+                self._vectors = vector
+            else:
+                self._vectors = self._embed([e['query'] for e in self._entries])
+
+            # 超出容量时淘汰最早的条目
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                for entry in self._entries[:overflow]:
+                    self._exact.pop(self._normalize(entry['query']), None)
+                del self._entries[:overflow]
+                if self._vectors is not None:
+                    self._vectors = self._vectors[overflow:]
+            self._save()
+
+    def _load(self):
+        """读取磁盘缓存（Schema哈希或模型不一致时忽略）"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('schema_hash') != self.schema_hash:
+                return
+            entries = data['entries']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        self._entries = [{'query': e['query'], 'sql': e['sql']} for e in entries]
+        self._exact = {self._normalize(e['query']): e['sql'] for e in self._entries}
+        if SENTENCE_TRANSFORMERS_AVAILABLE and data.get('model') == self.model_name \
+                and all('vector' in e for e in entries):
+            self._vectors = np.asarray([e['vector'] for e in entries], dtype=np.float32)
+        elif self._entries:
+            # 向量缺失（如之前在无模型环境下写入）时重新计算
+            self._vectors = self._embed([e['query'] for e in self._entries])
+
+    def _save(self):
+        """原子写入磁盘缓存（调用方持有锁）"""
+        vectors = self._vectors
+        if vectors is not None and len(vectors) != len(self._entries):
+            vectors = None
+        entries = []
+        for index, entry in enumerate(self._entries):
+            item = dict(entry)
+            if vectors is not None:
+                item['vector'] = vectors[index].tolist()
+            entries.append(item)
+
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'schema_hash': self.schema_hash,
+                    'model': self.model_name if vectors is not None else None,
+                    'entries': entries
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("语义缓存写入失败: %s", e)
+
 
 class CoreDataEngine:
     """
@@ -35,30 +364,48 @@ class CoreDataEngine:
         self.database_path = database_path
         self.database_name = Path(database_path).stem
         
+        # 持久化数据库连接（所有查询共用，避免每次调用重新打开数据库）
+        self._conn_lock = threading.Lock()
+        self._conn = self._open_connection()
+        
+        # 只读查询结果缓存：(Schema+SQL哈希, 数据库文件版本) -> (过期时间, DataFrame, 记录数)
+        self._result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        
         # 简化的配置
         self.business_terms = self._load_business_terms()
         self.schema_info = self._load_schema_info()
+        self._prompt_prefix = self._build_prompt_prefix()
+        self._prefix_ids: Optional[List[int]] = None  # 固定前缀的分词结果（仅DEBUG日志统计token数时计算）
+        
+        # NL2SQL语义缓存（持久化在数据库文件旁，按Schema哈希隔离）
+        self._schema_hash = _fingerprint(json.dumps(self.schema_info, sort_keys=True, ensure_ascii=False))
+        self.semantic_cache = SemanticCache(f"{database_path}.semantic_cache.json", self._schema_hash)
         
         # LLM客户端
         self.llm_client = self._init_llm()
         
-        print(f"[INFO] CoreDataEngine 初始化完成: {self.database_name}")
+        logger.info("CoreDataEngine 初始化完成: %s", self.database_name)
     
-    def query(self, user_query: str, analysis_mode: str = "auto") -> Dict[str, Any]:
+    def query(self, user_query: str, analysis_mode: str = "auto",
+              on_analysis: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         统一查询接口
         
         Args:
             user_query: 用户自然语言查询
-            analysis_mode: 分析模式 (auto|simple|detailed)
+            analysis_mode: 分析模式 (auto|simple|detailed|async)
+                async模式下立即返回数据，统计、洞察和可视化结果在后台线程生成后
+                以字典形式传给on_analysis回调（未提供回调时不生成）
+            on_analysis: async模式下接收分析结果的回调，在后台线程中调用
             
         Returns:
-            统一的查询结果
+            统一的查询结果（只包含可JSON序列化的内容）
         """
         start_time = time.time()
         
         try:
-            print(f"[INFO] 处理查询: {user_query}")
+            logger.info("处理查询: %s", user_query)
             
             # 1. NL2SQL转换和执行
             sql_result = self._process_nl2sql(user_query)
@@ -66,25 +413,42 @@ class CoreDataEngine:
             if not sql_result['success']:
                 return sql_result
             
-            # 2. 数据分析（根据模式）
-            if analysis_mode in ["auto", "detailed"] and len(sql_result['data']) > 0:
-                sql_result['statistics'] = self._generate_statistics(sql_result['data'])
-                sql_result['insights'] = self._generate_insights(sql_result['data'], user_query)
-            
-            # 3. 可视化准备
-            if len(sql_result['data']) > 1:
-                sql_result['visualization'] = self._prepare_visualization(sql_result['data'], user_query)
+            # 2. 数据分析与可视化准备（根据模式，直接使用查询得到的DataFrame）
+            # 返回给调用方的记录由原始行构造，保留整数精度和NULL；DataFrame仅用于分析
+            df = sql_result['data']
+            records = sql_result.pop('records')
+            num_cols = df.select_dtypes(include=['number']).columns
+            cat_cols = df.select_dtypes(include=['object']).columns
+            analyze = analysis_mode in ["auto", "detailed", "async"] and len(df) > 0
+            
+            if analysis_mode == "async":
+                # 异步模式：立即返回数据，分析结果在后台线程生成后通过on_analysis回调返回
+                sql_result['data'] = records
+                if on_analysis is not None:
+                    _ANALYSIS_EXECUTOR.submit(
+                        self._run_analysis_callback, on_analysis, df, num_cols, cat_cols, user_query, records, analyze
+                    )
+            else:
+                # 统计与洞察在后台线程生成，同时在当前线程序列化结果并准备可视化
+                analysis_future = _ANALYSIS_EXECUTOR.submit(self._analyze_data, df, num_cols, cat_cols, user_query) if analyze else None
+                
+                # 可视化数据表引用同一份记录
+                sql_result['data'] = records
+                sql_result.update(self._run_analysis(df, num_cols, cat_cols, user_query, sql_result['data'], analyze=False))
+                
+                if analysis_future is not None:
+                    sql_result['statistics'], sql_result['insights'] = analysis_future.result()
             
             # 4. 添加元数据
             sql_result['execution_time'] = time.time() - start_time
             sql_result['database'] = self.database_name
             sql_result['query_mode'] = analysis_mode
             
-            print(f"[INFO] 查询完成，耗时: {sql_result['execution_time']:.2f}秒")
+            logger.info("查询完成，耗时: %.2f秒", sql_result['execution_time'])
             return sql_result
             
         except Exception as e:
-            print(f"[ERROR] 查询处理失败: {e}")
+            logger.error("查询处理失败: %s", e)
             return {
                 'success': False,
                 'error': str(e),
@@ -95,8 +459,13 @@ class CoreDataEngine:
     def _process_nl2sql(self, user_query: str) -> Dict[str, Any]:
         """NL2SQL处理 - 简化版本"""
         try:
-            # 1. 生成SQL
-            sql = self._generate_sql(user_query)
+            # 1. 生成SQL（语义缓存命中时跳过LLM调用）
+            sql = self.semantic_cache.lookup(user_query, confirm=self._confirm_equivalent_query)
+            cache_hit = sql is not None
+            if cache_hit:
+                logger.debug("语义缓存命中: %s", sql)
+            else:
+                sql = self._generate_sql(user_query)
             
             if not sql:
                 return {
@@ -105,13 +474,29 @@ class CoreDataEngine:
                     'data': []
                 }
             
-            # 2. 执行SQL
-            data, record_count = self._execute_sql(sql)
+            # 2. 只执行只读查询，生成的SQL为修改语句等时直接返回错误
+            normalized_sql = self._normalize_read_only_sql(sql)
+            if normalized_sql is None:
+                logger.warning("拒绝执行非只读SQL: %s", sql)
+                return {
+                    'success': False,
+                    'error': '仅允许执行只读查询（SELECT/WITH）',
+                    'sql': sql,
+                    'data': []
+                }
+            
+            # 3. 执行SQL（缓存只保存SQL，数据每次重新查询）
+            data, records, record_count = self._execute_sql(sql, normalized_sql)
+            
+            # 空结果可能来自执行失败，不写入缓存
+            if not cache_hit and record_count > 0:
+                self.semantic_cache.put(user_query, sql)
             
             return {
                 'success': True,
                 'sql': sql,
                 'data': data,
+                'records': records,
                 'record_count': record_count
             }
             
@@ -127,6 +512,8 @@ class CoreDataEngine:
         try:
             # 构建提示词
             prompt = self._build_sql_prompt(user_query)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("提示词约 %s 个token", self._count_prompt_tokens(prompt))
             
             # 调用LLM
             response = self._call_llm(prompt)
@@ -134,18 +521,72 @@ class CoreDataEngine:
             # 提取SQL
             sql = self._extract_sql_from_response(response)
             
-            print(f"[DEBUG] 生成SQL: {sql}")
+            logger.debug("生成SQL: %s", sql)
             return sql
             
         except Exception as e:
-            print(f"[ERROR] SQL生成失败: {e}")
+            logger.error("SQL生成失败: %s", e)
             return None
     
-    def _build_sql_prompt(self, user_query: str) -> str:
-        """构建SQL生成提示词"""
+    def _confirm_equivalent_query(self, query: str, cached_query: str) -> bool:
+        """由LLM确认两个查询是否语义等价（用于中等相似度的语义缓存命中）"""
+        try:
+            prompt = f"""判断下面两个数据查询需求是否完全等价（查询的指标、条件和范围都相同）。
+
+查询A: {query}
+查询B: {cached_query}
+
+只回答"是"或"否"。"""
+            return self._call_llm(prompt).strip().startswith("是")
+        except Exception as e:
+            logger.warning("查询等价性确认失败: %s", e)
+            return False
+    
+    # SQL生成提示词中用户查询之后的固定部分
+    _SQL_PROMPT_SUFFIX = """
+
+请生成对应的SQL查询语句，只返回SQL代码，不要其他解释。
+SQL语句要求:
+1. 使用正确的表名和字段名
+2. 应用相关的业务规则
+3. 确保语法正确
+4. 适当使用JOIN关联表
+
+SQL:"""
+    
+    # 按查询意图筛选Schema：表数量超过TOP_K时只向LLM提供最相关的TOP_K个表，
+    # 最相关表的相似度低于阈值时（意图不明确）仍提供完整Schema
+    _SCHEMA_FILTER_TOP_K = 5
+    _SCHEMA_FILTER_MIN_SCORE = 0.3
+    
+    def _select_tables(self, user_query: str) -> Optional[List[str]]:
+        """选出与查询最相关的表（按Schema原有顺序），表数量不超过TOP_K或模型不可用时返回None
+        
+        表向量在首次筛选时计算，按数据库路径和Schema哈希在引擎实例之间共用。
+        """
+        if len(self.schema_info) <= self._SCHEMA_FILTER_TOP_K:
+            return None
+        table_names, table_emb = _get_table_embeddings(self.database_path, self._schema_hash, self.schema_info)
+        if table_emb is None:
+            return None
+        query_vector = _embed_query(user_query)
+        if query_vector is None:
+            return None
+        scores = table_emb @ query_vector
+        top_indexes = np.argsort(-scores)[:self._SCHEMA_FILTER_TOP_K]
+        if float(scores[top_indexes[0]]) < self._SCHEMA_FILTER_MIN_SCORE:
+            return None
+        return [table_names[index] for index in sorted(top_indexes)]
+    
+    def _build_prompt_prefix(self, table_names: Optional[List[str]] = None) -> str:
+        """构建SQL生成提示词中用户查询之前的部分（未指定表时包含完整Schema，在引擎生命周期内不变）"""
+        if table_names is None:
+            table_names = self.schema_info
+        
         # 获取表结构信息
         tables_info = []
-        for table_name, table_info in self.schema_info.items():
+        for table_name in table_names:
+            table_info = self.schema_info[table_name]
             columns = ", ".join([f"{col['name']}({col['type']})" for col in table_info['columns']])
             tables_info.append(f"表 {table_name}: {columns}")
         
@@ -154,7 +595,7 @@ class CoreDataEngine:
         # 业务术语
         terms_text = "\n".join([f"- {term}: {definition}" for term, definition in self.business_terms.items()])
         
-        prompt = f"""你是一个SQL专家，请根据用户查询生成准确的SQL语句。
+        return f"""你是一个SQL专家，请根据用户查询生成准确的SQL语句。
 
 数据库结构:
 {schema_text}
@@ -162,18 +603,24 @@ class CoreDataEngine:
 业务术语定义:
 {terms_text}
 
-用户查询: {user_query}
-
-请生成对应的SQL查询语句，只返回SQL代码，不要其他解释。
-SQL语句要求:
-1. 使用正确的表名和字段名
-2. 应用相关的业务规则
-3. 确保语法正确
-4. 适当使用JOIN关联表
-
-SQL:"""
-        
-        return prompt
+用户查询: """
+    
+    def _build_sql_prompt(self, user_query: str) -> str:
+        """构建SQL生成提示词（未筛选Schema时固定前缀保持逐字节一致，便于LLM服务端前缀缓存命中）"""
+        table_names = self._select_tables(user_query)
+        prefix = self._prompt_prefix if table_names is None else self._build_prompt_prefix(table_names)
+        return prefix + user_query + self._SQL_PROMPT_SUFFIX
+    
+    def _count_prompt_tokens(self, prompt: str) -> Optional[int]:
+        """估算提示词token数（仅用于DEBUG日志；固定前缀只分词一次，之后只对用户查询及之后的部分分词）"""
+        encoder = _get_prompt_encoder()
+        if encoder is None:
+            return None
+        if prompt.startswith(self._prompt_prefix):
+            if self._prefix_ids is None:
+                self._prefix_ids = encoder.encode(self._prompt_prefix)
+            return len(self._prefix_ids) + len(encoder.encode(prompt[len(self._prompt_prefix):]))
+        return len(encoder.encode(prompt))
     
     def _call_llm(self, prompt: str) -> str:
         """调用LLM"""
@@ -190,128 +637,255 @@ SQL:"""
     
     def _extract_sql_from_response(self, response: str) -> str:
         """从LLM响应中提取SQL"""
-        # 移除markdown格式
-        if "```sql" in response:
-            sql = response.split("```sql")[1].split("```")[0].strip()
-        elif "```" in response:
-            sql = response.split("```")[1].strip()
-        else:
-            sql = response.strip()
+        # 移除markdown格式（优先取sql代码块，其次取第一个代码块，未闭合时取到结尾）
+        match = _SQL_FENCE.search(response) or _CODE_FENCE.search(response)
+        sql = (match.group(1) if match else response).strip()
         
         # 清理SQL
         sql = sql.replace("SQL:", "").strip()
         
         return sql
     
-    def _execute_sql(self, sql: str) -> tuple:
-        """执行SQL查询"""
+    # 预编译语句缓存容量、只读查询结果缓存容量及有效期（秒）
+    _STATEMENT_CACHE_SIZE = 128
+    _RESULT_CACHE_SIZE = 128
+    _RESULT_CACHE_TTL = 60.0
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """打开引擎共用的数据库连接"""
+        # sqlite3按SQL文本缓存预编译语句（LRU），相同SQL重复执行时不再重新解析和规划；
+        # 保持默认事务处理，且只设置连接级PRAGMA，不改变数据库文件本身的日志模式；
+        # query_only作为只读校验之外的兜底，禁止通过该连接修改数据库
+        conn = sqlite3.connect(self.database_path, check_same_thread=False,
+                               cached_statements=self._STATEMENT_CACHE_SIZE)
+        for pragma in (
+            "PRAGMA query_only=ON",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA mmap_size=268435456",
+            "PRAGMA cache_size=-65536",
+        ):
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                # 只读文件等情况下部分PRAGMA无法生效，不影响查询
+                logger.warning("%s 设置失败: %s", pragma, e)
+        return conn
+    
+    def close(self):
+        """关闭数据库连接"""
+        conn, self._conn = getattr(self, '_conn', None), None
+        if conn is not None:
+            with self._conn_lock:
+                conn.close()
+    
+    def __del__(self):
         try:
-            conn = sqlite3.connect(self.database_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            
-            # 转换为字典列表
-            data = [dict(row) for row in rows]
-            record_count = len(data)
-            
-            conn.close()
-            
-            print(f"[DEBUG] SQL执行成功，返回 {record_count} 条记录")
-            return data, record_count
+            self.close()
+        except Exception:
+            pass
+    
+    def _data_version(self) -> tuple:
+        """数据库文件（及WAL文件）的mtime和大小，数据变化后随之变化"""
+        version = []
+        for path in (self.database_path, f"{self.database_path}-wal"):
+            try:
+                st = os.stat(path)
+                version += [st.st_mtime_ns, st.st_size]
+            except OSError:
+                version += [None, None]
+        return tuple(version)
+    
+    @staticmethod
+    def _is_read_only_sql(sql: str) -> bool:
+        """判断SQL是否为只读查询（引擎只执行只读查询）"""
+        return sql.lstrip().upper().startswith(("SELECT", "WITH"))
+    
+    def _normalize_read_only_sql(self, sql: str) -> Optional[str]:
+        """返回只读查询的规范化SQL（作为结果缓存键，空白和大小写写法不同的同一查询共用缓存），非只读查询返回None"""
+        if not SQLGLOT_AVAILABLE:
+            return sql if self._is_read_only_sql(sql) else None
+        try:
+            parsed = sqlglot.parse_one(sql, read='sqlite')
+        except Exception:
+            return None
+        if not isinstance(parsed, sqlglot_exp.Query):
+            return None
+        return parsed.sql(dialect='sqlite')
+    
+    def _execute_sql(self, sql: str, normalized_sql: str) -> tuple:
+        """执行SQL查询，返回(DataFrame, 记录列表, 记录数)
+        
+        DataFrame供统计分析使用（数值列统一为浮点）；记录列表由原始行元组构造，
+        保留数据库返回的原始值（整数不转浮点，NULL为None），作为对外返回的数据。
+        调用方需先经_normalize_read_only_sql校验，normalized_sql为其返回的规范化SQL。
+        查询的行按(Schema+SQL哈希, 数据库文件版本)短时缓存，返回的DataFrame在调用方之间共享，只读使用。
+        """
+        try:
+            cache_key = (_fingerprint(f"{self._schema_hash}|{normalized_sql}"), self._data_version())
+            with self._result_cache_lock:
+                cached = self._result_cache.get(cache_key)
+                if cached is not None and cached[0] > time.monotonic():
+                    self._result_cache.move_to_end(cache_key)
+                    _, df, columns, rows = cached
+                    logger.debug("SQL结果缓存命中，返回 %s 条记录", len(rows))
+                    return df, [dict(zip(columns, row)) for row in rows], len(rows)
+            
+            # 连接跨线程共用，执行与读取结果期间加锁；行元组由pandas直接按列构造DataFrame
+            with self._conn_lock:
+                cursor = self._conn.execute(sql)
+                rows = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            
+            record_count = len(rows)
+            with self._result_cache_lock:
+                self._result_cache[cache_key] = (time.monotonic() + self._RESULT_CACHE_TTL, df, columns, rows)
+                self._result_cache.move_to_end(cache_key)
+                while len(self._result_cache) > self._RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+            
+            logger.debug("SQL执行成功，返回 %s 条记录", record_count)
+            return df, [dict(zip(columns, row)) for row in rows], record_count
             
         except Exception as e:
-            print(f"[ERROR] SQL执行失败: {e}")
-            return [], 0
+            logger.error("SQL执行失败: %s", e)
+            return pd.DataFrame(), [], 0
     
-    def _generate_statistics(self, data: List[Dict]) -> Dict[str, Any]:
+    def _analyze_data(self, df, num_cols, cat_cols, user_query: str) -> tuple:
+        """生成统计信息和业务洞察（两者共用一次数值汇总）"""
+        numeric_agg = self._aggregate_numeric(df, num_cols, cat_cols)
+        return (
+            self._generate_statistics(df, num_cols, cat_cols, numeric_agg),
+            self._generate_insights(df, num_cols, cat_cols, user_query, numeric_agg)
+        )
+    
+    def _run_analysis(self, df, num_cols, cat_cols, user_query: str, records: List[Dict[str, Any]], analyze: bool) -> Dict[str, Any]:
+        """生成分析结果：统计与洞察（analyze为True时）及可视化（多于1条记录时）"""
+        results = {}
+        if analyze:
+            results['statistics'], results['insights'] = self._analyze_data(df, num_cols, cat_cols, user_query)
+        
+        if len(df) > 1:
+            results['visualization'] = self._prepare_visualization(df, num_cols, cat_cols, user_query, records)
+        
+        return results
+    
+    def _run_analysis_callback(self, on_analysis: Callable[[Dict[str, Any]], None], df, num_cols, cat_cols,
+                               user_query: str, records: List[Dict[str, Any]], analyze: bool):
+        """async模式的后台任务：生成分析结果并交给回调（异常只记录日志，不影响已返回的查询结果）"""
+        try:
+            on_analysis(self._run_analysis(df, num_cols, cat_cols, user_query, records, analyze))
+        except Exception as e:
+            logger.error("异步分析失败: %s", e)
+    
+    def _aggregate_numeric(self, df, num_cols, cat_cols):
+        """一次性计算所有数值列的count/sum/mean/min/max（行为统计量，列为数值列）"""
+        try:
+            numeric = df[num_cols]
+            if NUMBA_AVAILABLE and numeric.size > _NUMBA_MIN_CELLS:
+                values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+                return pd.DataFrame(
+                    _column_stats_kernel(values),
+                    index=['count', 'sum', 'mean', 'min', 'max'],
+                    columns=numeric.columns
+                )
+            return numeric.agg(['count', 'sum', 'mean', 'min', 'max'])
+        except Exception as e:
+            logger.warning("数值汇总失败: %s", e)
+            return None
+    
+    def _generate_statistics(self, df, num_cols, cat_cols, numeric_agg=None) -> Dict[str, Any]:
         """生成统计信息 - 简化版本"""
-        if not data:
+        if df.empty:
             return {}
         
         try:
-            import pandas as pd
-            df = pd.DataFrame(data)
+            if numeric_agg is None:
+                numeric_agg = self._aggregate_numeric(df, num_cols, cat_cols)
             
             stats = {
-                'total_records': len(data),
+                'total_records': len(df),
                 'columns': list(df.columns),
                 'numeric_summary': {}
             }
             
-            # 数值列统计
-            numeric_cols = df.select_dtypes(include=['number']).columns
-            for col in numeric_cols:
+            # 数值列统计（序列化时统一转换类型）
+            for col, col_stats in numeric_agg.items():
                 stats['numeric_summary'][col] = {
-                    'count': int(df[col].count()),
-                    'sum': float(df[col].sum()),
-                    'mean': float(df[col].mean()),
-                    'min': float(df[col].min()),
-                    'max': float(df[col].max())
+                    'count': int(col_stats['count']),
+                    'sum': float(col_stats['sum']),
+                    'mean': float(col_stats['mean']),
+                    'min': float(col_stats['min']),
+                    'max': float(col_stats['max'])
                 }
             
             return stats
             
         except Exception as e:
-            print(f"[WARN] 统计生成失败: {e}")
-            return {'total_records': len(data)}
+            logger.warning("统计生成失败: %s", e)
+            return {'total_records': len(df)}
     
-    def _generate_insights(self, data: List[Dict], user_query: str) -> List[str]:
+    def _generate_insights(self, df, num_cols, cat_cols, user_query: str, numeric_agg=None) -> List[str]:
         """生成业务洞察 - 简化版本"""
         insights = []
         
         try:
-            if not data:
+            if df.empty:
                 return ["查询未返回数据"]
             
             # 基本洞察
-            insights.append(f"查询返回 {len(data)} 条记录")
+            insights.append(f"查询返回 {len(df)} 条记录")
             
             # 数值分析洞察
-            if len(data) > 1:
-                import pandas as pd
-                df = pd.DataFrame(data)
-                numeric_cols = df.select_dtypes(include=['number']).columns
+            if len(df) > 1:
+                if numeric_agg is None:
+                    numeric_agg = self._aggregate_numeric(df, num_cols, cat_cols)
                 
-                for col in numeric_cols:
-                    if df[col].count() > 0:
-                        max_val = df[col].max()
-                        min_val = df[col].min()
+                for col, col_stats in numeric_agg.items():
+                    if col_stats['count'] > 0:
+                        max_val = col_stats['max']
+                        min_val = col_stats['min']
+                        # 汇总表统一为浮点，整数列还原为整数显示
+                        if df[col].dtype.kind in 'iu':
+                            max_val, min_val = int(max_val), int(min_val)
                         insights.append(f"{col}: 最大值 {max_val}, 最小值 {min_val}")
             
             return insights[:5]  # 最多5个洞察
             
         except Exception as e:
-            print(f"[WARN] 洞察生成失败: {e}")
-            return [f"数据分析完成，共 {len(data)} 条记录"]
+            logger.warning("洞察生成失败: %s", e)
+            return [f"数据分析完成，共 {len(df)} 条记录"]
     
-    def _prepare_visualization(self, data: List[Dict], user_query: str) -> Dict[str, Any]:
-        """准备可视化数据 - 简化版本"""
+    def _prepare_visualization(self, df, num_cols, cat_cols, user_query: str,
+                               records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """准备可视化数据 - 简化版本（数据表直接引用query()返回的记录列表，不复制数据）
+        
+        大结果集的数据表为按原有顺序排列的抽样记录（带sampled标记），record_count仍为全量记录数。
+        """
         try:
-            import pandas as pd
-            df = pd.DataFrame(data)
+            main_table = {
+                'data': records,
+                'columns': list(df.columns),
+                'record_count': len(df)
+            }
+            if len(records) > _VIZ_SAMPLE_MIN_ROWS:
+                # 图表只需要数据分布，完整数据仍在结果的data字段中
+                indexes = np.sort(np.random.default_rng(0).choice(len(records), _VIZ_SAMPLE_SIZE, replace=False))
+                main_table['data'] = [records[index] for index in indexes]
+                main_table['sampled'] = True
             
             viz_data = {
                 'chart_ready': True,
                 'data_tables': {
-                    'main': {
-                        'data': data,
-                        'columns': list(df.columns),
-                        'record_count': len(data)
-                    }
+                    'main': main_table
                 },
                 'suggested_charts': []
             }
             
             # 简单的图表建议
-            numeric_cols = df.select_dtypes(include=['number']).columns
-            categorical_cols = df.select_dtypes(include=['object']).columns
-            
-            if len(categorical_cols) > 0 and len(numeric_cols) > 0:
+            if len(cat_cols) > 0 and len(num_cols) > 0:
                 viz_data['suggested_charts'] = ['bar', 'pie']
-            elif len(numeric_cols) > 1:
+            elif len(num_cols) > 1:
                 viz_data['suggested_charts'] = ['line', 'scatter']
             else:
                 viz_data['suggested_charts'] = ['table']
@@ -319,7 +893,7 @@ SQL:"""
             return viz_data
             
         except Exception as e:
-            print(f"[WARN] 可视化准备失败: {e}")
+            logger.warning("可视化准备失败: %s", e)
             return {'chart_ready': False}
     
     def _load_business_terms(self) -> Dict[str, str]:
@@ -334,37 +908,24 @@ SQL:"""
     def _load_schema_info(self) -> Dict[str, Any]:
         """加载数据库schema - 自动提取"""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.cursor()
-            
-            # 获取所有表
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
+            # 一条语句读取所有表的列信息（替代逐表PRAGMA table_info）
+            with self._conn_lock:
+                rows = self._conn.execute(_SCHEMA_COLUMNS_QUERY).fetchall()
             
             schema_info = {}
-            for (table_name,) in tables:
-                # 获取表结构
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                
-                schema_info[table_name] = {
-                    'columns': [
-                        {
-                            'name': col[1],
-                            'type': col[2],
-                            'not_null': bool(col[3]),
-                            'primary_key': bool(col[5])
-                        }
-                        for col in columns
-                    ]
-                }
-            
-            conn.close()
-            print(f"[DEBUG] Schema加载完成，共 {len(schema_info)} 个表")
+            for table_name, col_name, col_type, not_null, primary_key in rows:
+                schema_info.setdefault(table_name, {'columns': []})['columns'].append({
+                    'name': col_name,
+                    'type': col_type,
+                    'not_null': bool(not_null),
+                    'primary_key': bool(primary_key)
+                })
+            
+            logger.debug("Schema加载完成，共 %s 个表", len(schema_info))
             return schema_info
             
         except Exception as e:
-            print(f"[ERROR] Schema加载失败: {e}")
+            logger.error("Schema加载失败: %s", e)
             return {}
     
     def _init_llm(self):
@@ -374,7 +935,7 @@ SQL:"""
             
             api_key = os.getenv('DEEPSEEK_API_KEY')
             if not api_key:
-                print("[WARN] 未找到DEEPSEEK_API_KEY，LLM功能不可用")
+                logger.warning("未找到DEEPSEEK_API_KEY，LLM功能不可用")
                 return None
             
             client = ChatOpenAI(
@@ -384,11 +945,11 @@ SQL:"""
                 temperature=0.1
             )
             
-            print("[DEBUG] LLM客户端初始化成功")
+            logger.debug("LLM客户端初始化成功")
             return client
             
         except Exception as e:
-            print(f"[ERROR] LLM初始化失败: {e}")
+            logger.error("LLM初始化失败: %s", e)
             return None
 
 
@@ -12,6 +12,7 @@ DataProxy 纯LLM驱动的智能数据导入系统
 
 import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import json
 import re
@@ -51,6 +52,136 @@ class SafeLogger:
 
 logger = SafeLogger()
 
+# Excel读取引擎：python-calamine（Rust实现，需pandas>=2.2）可选，缺失时.xlsx使用openpyxl，其他格式由pandas自动选择
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+
+def _read_excel(file_path: str, **kwargs) -> pd.DataFrame:
+    """读取Excel文件，显式指定引擎以跳过格式探测"""
+    if CALAMINE_AVAILABLE:
+        engine = 'calamine'
+    elif file_path.endswith('.xlsx'):
+        engine = 'openpyxl'
+    else:
+        engine = None
+    return pd.read_excel(file_path, engine=engine, **kwargs)
+
+
+# 文件信息磁盘缓存（位于项目目录下的.dp_cache，与工作目录无关；按文件路径、mtime和大小失效，内容以JSON存储）
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_FILE_INFO_CACHE_PATH = os.path.join(_PROJECT_ROOT, ".dp_cache", "file_info.db")
+
+
+def _read_file_basic_info(file_path: str) -> Dict[str, Any]:
+    """读取文件并提取基本信息（模块级函数，可在子进程中执行）"""
+    try:
+        # 读取文件内容
+        if file_path.endswith('.csv'):
+            df = pd.read_csv(file_path, nrows=20)  # 读取更多行供LLM分析
+        else:
+            df = _read_excel(file_path, nrows=20)
+
+        # 一次性物化为对象数组（保留各列原始值类型），空值与唯一值统计都基于该数组按列切片完成
+        arr = df.to_numpy(dtype=object)
+        null_mask = pd.isna(arr)
+        column_uniques = [
+            pd.unique(arr[~null_mask[:, i], i])
+            for i in range(arr.shape[1])
+        ]
+
+        # 提取详细信息供LLM分析
+        file_info = {
+            'file_path': file_path,
+            'file_name': os.path.basename(file_path),
+            'file_size': os.path.getsize(file_path),
+            'columns': list(df.columns),
+            'column_count': len(df.columns),
+            'sample_rows': df.iloc[:10].to_dict('records'),
+            'data_types': {col: str(dtype) for col, dtype in df.dtypes.items()},
+            'null_counts': dict(zip(df.columns, null_mask.sum(axis=0).tolist())),
+            'unique_counts': dict(zip(df.columns, (len(u) for u in column_uniques))),
+            'sample_values_per_column': dict(zip(df.columns, (u[:5].tolist() for u in column_uniques)))
+        }
+
+        return file_info
+
+    except Exception as e:
+        logger.error(f"❌ 提取文件信息失败 {file_path}: {e}")
+        return {}
+
+
+# 业务关键词多模式匹配（可选，缺失时逐个关键词做子串判断）
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 表名生成与字段业务含义推断使用的关键词
+_BUSINESS_KEYWORDS = ('客户', '合同', '余额', '日期', '贷款', '存款', '分类')
+
+# 字段业务含义（按优先级排列，取第一个出现在字段名中的关键词）
+_FIELD_MEANINGS = (
+    ('客户', '客户相关信息'),
+    ('合同', '合同相关信息'),
+    ('余额', '金额余额'),
+    ('日期', '日期时间'),
+)
+
+if AHOCORASICK_AVAILABLE:
+    _BUSINESS_KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _BUSINESS_KEYWORDS:
+        _BUSINESS_KEYWORD_AUTOMATON.add_word(_keyword, _keyword)
+    _BUSINESS_KEYWORD_AUTOMATON.make_automaton()
+else:
+    _BUSINESS_KEYWORD_AUTOMATON = None
+
+
+def _find_business_keywords(name: str) -> set:
+    """一次扫描找出名称中出现的所有业务关键词"""
+    if _BUSINESS_KEYWORD_AUTOMATON is not None:
+        return {keyword for _, keyword in _BUSINESS_KEYWORD_AUTOMATON.iter(name)}
+    return {keyword for keyword in _BUSINESS_KEYWORDS if keyword in name}
+
+
+# LLM响应解析：JSON解码器与首尾markdown代码块标记
+_JSON_DECODER = json.JSONDecoder()
+_CODE_FENCE_EDGES = re.compile(r"^```(?:json)?|```$")
+
+
+class _JsonObjectTracker:
+    """增量跟踪流式文本中第一个JSON对象是否已完整（忽略字符串内的括号）"""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """追加一段文本，第一个JSON对象闭合时返回True"""
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '{':
+                self.depth += 1
+            elif self.depth > 0:
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        return True
+        return False
+
 
 class IntelligentDataImporter:
     """
@@ -75,10 +206,14 @@ class IntelligentDataImporter:
         self.unlimited_retries = True  # 无限制重试
         self.deep_analysis_mode = True   # 启用深度分析模式
         self.simplified_mode = False    # 关闭简化模式
+        self.classification_batch_size = 10  # 文件分类每次LLM调用包含的文件数
 
         # API密钥初始化
         self.api_key = self._init_llm_client(api_key)
 
+        # 持久HTTP会话：多次LLM调用（含重试和并发的分批调用）复用keep-alive连接，避免重复TCP/TLS握手
+        self._http = self._init_http_session()
+
         # 数据存储
         self.discovered_files = {}  # 发现的所有文件
         self.llm_file_analysis = {}  # LLM文件分析结果
@@ -86,6 +221,9 @@ class IntelligentDataImporter:
         self.llm_business_intelligence = {}  # LLM业务智能分析
         self.import_execution_log = []  # 详细执行日志
 
+        # 文件信息磁盘缓存（不可用时每次重新读取文件）
+        self._fs_cache = self._open_file_info_cache()
+
         logger.info("🧠 纯LLM智能数据导入系统初始化完成")
 
     def _init_llm_client(self, api_key: Optional[str] = None) -> Optional[str]:
@@ -108,6 +246,17 @@ class IntelligentDataImporter:
             logger.error(f"❌ API密钥配置失败: {e}")
             raise
 
+    def _init_http_session(self) -> requests.Session:
+        """创建LLM API的持久HTTP会话（连接池容量覆盖并发的分批调用）"""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        })
+        return session
+
     def process_batch_import(self, file_paths: List[str], output_db_path: str) -> Dict[str, Any]:
         """
         纯LLM驱动的批量导入主流程
@@ -162,91 +311,154 @@ class IntelligentDataImporter:
         """
         logger.info("🔍 LLM文件发现和分类分析")
 
-        # 收集所有文件的基本信息
-        for file_path in file_paths:
-            if os.path.exists(file_path) and file_path.endswith(('.xlsx', '.xls', '.csv')):
-                try:
-                    # 读取文件基本信息
-                    file_info = self._extract_file_basic_info(file_path)
-                    self.discovered_files[file_path] = file_info
-
-                    logger.info(f"📄 发现文件: {os.path.basename(file_path)}")
-
-                except Exception as e:
-                    logger.warning(f"⚠️ 读取文件失败 {file_path}: {e}")
+        # 收集所有文件的基本信息：先查磁盘缓存，未命中的文件在多个进程中并行读取
+        candidate_paths = [
+            file_path for file_path in file_paths
+            if os.path.exists(file_path) and file_path.endswith(('.xlsx', '.xls', '.csv'))
+        ]
+        cached = {file_path: self._load_cached_file_info('basic_info', file_path) for file_path in candidate_paths}
+        missed_paths = [file_path for file_path, (_, info) in cached.items() if info is None]
+        extracted = dict(zip(missed_paths, self._read_files_basic_info(missed_paths)))
+
+        # 按原始顺序合并结果（主进程中写入缓存）
+        for file_path in candidate_paths:
+            cache_key, file_info = cached[file_path]
+            if file_info is None:
+                file_info = extracted[file_path]
+                self._store_cached_file_info('basic_info', cache_key, file_info)
+
+            self.discovered_files[file_path] = file_info
+            logger.info(f"📄 发现文件: {os.path.basename(file_path)}")
 
         # 使用LLM分析和分类所有文件
         if self.discovered_files:
             self._llm_classify_files_by_content()
 
-    def _extract_file_basic_info(self, file_path: str) -> Dict[str, Any]:
-        """提取文件基本信息供LLM分析"""
+    def _open_file_info_cache(self) -> Optional[sqlite3.Connection]:
+        """打开文件信息磁盘缓存"""
         try:
-            # 读取文件内容
-            if file_path.endswith('.csv'):
-                df = pd.read_csv(file_path, nrows=20)  # 读取更多行供LLM分析
-            else:
-                df = pd.read_excel(file_path, nrows=20)
-
-            # 提取详细信息供LLM分析
-            file_info = {
-                'file_path': file_path,
-                'file_name': os.path.basename(file_path),
-                'file_size': os.path.getsize(file_path),
-                'columns': list(df.columns),
-                'column_count': len(df.columns),
-                'sample_rows': df.head(10).to_dict('records'),
-                'data_types': {col: str(dtype) for col, dtype in df.dtypes.items()},
-                'null_counts': df.isnull().sum().to_dict(),
-                'unique_counts': df.nunique().to_dict(),
-                'sample_values_per_column': {
-                    col: df[col].dropna().unique()[:5].tolist()
-                    for col in df.columns
-                }
-            }
+            os.makedirs(os.path.dirname(_FILE_INFO_CACHE_PATH), exist_ok=True)
+            conn = sqlite3.connect(_FILE_INFO_CACHE_PATH)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_info_json ("
+                "kind TEXT, path TEXT, mtime_ns INTEGER, size INTEGER, info TEXT, "
+                "PRIMARY KEY (kind, path))"
+            )
+            return conn
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️ 文件信息缓存不可用: {e}")
+            return None
 
-            return file_info
+    def _load_cached_file_info(self, kind: str, file_path: str) -> tuple:
+        """按(文件绝对路径, mtime, 大小)读取缓存的文件信息，返回(缓存键, 信息)，未命中时信息为None"""
+        if self._fs_cache is None:
+            return None, None
+        try:
+            abs_path = os.path.abspath(file_path)
+            stat = os.stat(abs_path)
+        except OSError:
+            return None, None
 
+        cache_key = (abs_path, stat.st_mtime_ns, stat.st_size)
+        try:
+            row = self._fs_cache.execute(
+                "SELECT info FROM file_info_json WHERE kind = ? AND path = ? AND mtime_ns = ? AND size = ?",
+                (kind, *cache_key)
+            ).fetchone()
+            if row is not None:
+                return cache_key, json.loads(row[0])
         except Exception as e:
-            logger.error(f"❌ 提取文件信息失败 {file_path}: {e}")
-            return {}
+            logger.warning(f"⚠️ 读取文件信息缓存失败 {file_path}: {e}")
+        return cache_key, None
+
+    def _store_cached_file_info(self, kind: str, cache_key: Optional[tuple], info):
+        """写入文件信息缓存（提取失败的空结果不缓存；日期等非JSON类型按字符串保存，与提示词中的序列化结果一致）"""
+        if self._fs_cache is None or cache_key is None or not info:
+            return
+        try:
+            with self._fs_cache:
+                self._fs_cache.execute(
+                    "INSERT OR REPLACE INTO file_info_json VALUES (?, ?, ?, ?, ?)",
+                    (kind, *cache_key, json.dumps(info, ensure_ascii=False, default=str))
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ 写入文件信息缓存失败 {cache_key[0]}: {e}")
+
+    def _cached_file_info(self, kind: str, file_path: str, extract):
+        """读取缓存的文件信息，未命中时调用extract提取并写入缓存"""
+        cache_key, info = self._load_cached_file_info(kind, file_path)
+        if info is None:
+            info = extract(file_path)
+            self._store_cached_file_info(kind, cache_key, info)
+        return info
+
+    def _read_files_basic_info(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """读取多个文件的基本信息（多于1个文件时使用进程池并行，进程池不可用时逐个读取）"""
+        if len(file_paths) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(file_paths))) as executor:
+                    return list(executor.map(_read_file_basic_info, file_paths))
+            except Exception as e:
+                logger.warning(f"⚠️ 并行读取文件失败，改为逐个读取: {e}")
+
+        return [_read_file_basic_info(file_path) for file_path in file_paths]
+
+    def _extract_file_basic_info(self, file_path: str) -> Dict[str, Any]:
+        """提取文件基本信息供LLM分析（文件未变化时读取磁盘缓存）"""
+        return self._cached_file_info('basic_info', file_path, _read_file_basic_info)
 
     def _llm_classify_files_by_content(self):
         """使用LLM分析文件内容进行智能分类"""
         logger.info("🧠 LLM智能文件分类分析")
 
-        # 构建文件分类分析提示词
-        classification_prompt = self._build_file_classification_prompt()
+        # 按批构建文件分类分析提示词（每批一次LLM调用，多批时并发调用）
+        file_paths = list(self.discovered_files)
+        batches = [
+            file_paths[i:i + self.classification_batch_size]
+            for i in range(0, len(file_paths), self.classification_batch_size)
+        ]
+        prompts = [self._build_file_classification_prompt(batch) for batch in batches]
 
         # 调用LLM进行文件分类
-        classification_result = self._call_llm_unlimited_retry(classification_prompt)
-
-        if classification_result:
+        if len(prompts) == 1:
+            classification_results = [self._call_llm_unlimited_retry(prompts[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(4, len(prompts))) as executor:
+                classification_results = list(executor.map(self._call_llm_unlimited_retry, prompts))
+
+        # 解析LLM分类结果，按文件名汇总（同名文件取第一个分类结果）
+        file_classifications = {}
+        for classification_result in classification_results:
+            if not classification_result:
+                continue
             try:
-                # 解析LLM分类结果
                 parsed_result = self._parse_llm_json_response(classification_result)
 
                 if parsed_result:
-                    # 更新文件分析结果
-                    for file_path, file_info in self.discovered_files.items():
-                        file_name = os.path.basename(file_path)
-
-                        # 查找LLM对该文件的分类结果
-                        for file_analysis in parsed_result.get('file_classifications', []):
-                            if file_analysis.get('file_name') == file_name:
-                                file_info['llm_classification'] = file_analysis
-                                logger.info(f"📋 LLM分类: {file_name} -> {file_analysis.get('file_type', 'unknown')}")
-                                break
+                    for file_analysis in parsed_result.get('file_classifications', []):
+                        file_classifications.setdefault(file_analysis.get('file_name'), file_analysis)
 
             except Exception as e:
                 logger.error(f"❌ LLM文件分类结果解析失败: {e}")
 
-    def _build_file_classification_prompt(self) -> str:
-        """构建文件分类分析提示词"""
+        # 更新文件分析结果
+        for file_path, file_info in self.discovered_files.items():
+            file_name = os.path.basename(file_path)
+            file_analysis = file_classifications.get(file_name)
+            if file_analysis is not None:
+                file_info['llm_classification'] = file_analysis
+                logger.info(f"📋 LLM分类: {file_name} -> {file_analysis.get('file_type', 'unknown')}")
+
+    def _build_file_classification_prompt(self, file_paths: Optional[List[str]] = None) -> str:
+        """构建文件分类分析提示词（未指定文件时包含所有已发现文件）"""
 
-        # 收集所有文件信息
+        if file_paths is None:
+            file_paths = list(self.discovered_files)
+
+        # 收集文件信息
         files_info = []
-        for file_path, file_info in self.discovered_files.items():
+        for file_path in file_paths:
+            file_info = self.discovered_files[file_path]
             # 转换样本数据为JSON可序列化格式
             sample_data = []
             for row in file_info['sample_rows'][:3]:  # 前3行样本
@@ -360,12 +572,7 @@ class IntelligentDataImporter:
                 else:
                     adjusted_tokens = self.max_tokens_per_request
 
-                # 构建请求数据
-                headers = {
-                    'Authorization': f'Bearer {self.api_key}',
-                    'Content-Type': 'application/json'
-                }
-
+                # 构建请求数据（认证头由持久会话统一设置）
                 data = {
                     'model': 'deepseek-chat',
                     'messages': [
@@ -379,24 +586,23 @@ class IntelligentDataImporter:
                         }
                     ],
                     'max_tokens': adjusted_tokens,
-                    'temperature': 0.1
+                    'temperature': 0.1,
+                    'stream': True
                 }
 
-                # 发送请求
-                response = requests.post(
+                # 发送请求（流式接收，避免整体读取长响应时连接中断）
+                with self._http.post(
                     'https://api.deepseek.com/chat/completions',
-                    headers=headers,
                     json=data,
-                    timeout=120  # 2分钟超时
-                )
+                    timeout=120,  # 2分钟超时（流式模式下为相邻数据块之间的超时）
+                    stream=True
+                ) as response:
+                    if response.status_code != 200:
+                        raise Exception(f"API错误: {response.status_code} - {response.text}")
+                    content = self._read_streamed_content(response)
 
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    logger.info(f"✅ API调用成功 (第 {attempt} 次尝试)")
-                    return content.strip()
-                else:
-                    raise Exception(f"API错误: {response.status_code} - {response.text}")
+                logger.info(f"✅ API调用成功 (第 {attempt} 次尝试)")
+                return content.strip()
 
             except Exception as e:
                 error_type = type(e).__name__
@@ -427,79 +633,58 @@ class IntelligentDataImporter:
 
         return None
 
+    def _read_streamed_content(self, response) -> str:
+        """读取SSE流式响应内容，第一个完整的JSON对象接收完毕后提前结束"""
+        chunks = []
+        tracker = _JsonObjectTracker()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data: '):
+                continue
+            payload = line[6:]
+            if payload == '[DONE]':
+                break
+            choices = json.loads(payload).get('choices')
+            if not choices:
+                continue
+            delta = choices[0].get('delta', {}).get('content') or ''
+            chunks.append(delta)
+            if tracker.feed(delta):
+                break
+        return ''.join(chunks)
+
     def _parse_llm_json_response(self, response: str) -> Optional[Dict[str, Any]]:
-        """解析LLM的JSON响应，支持多种格式"""
+        """解析LLM的JSON响应，支持多种格式（前后说明文字、markdown代码块）"""
         if not response or not response.strip():
             logger.warning("⚠️ 响应为空")
             return None
 
-        # 清理响应内容
-        cleaned_response = self._clean_llm_response(response)
+        response = response.strip()
+
+        # 从第一个'{'开始直接解码出完整的JSON对象，忽略其前后的文本
+        json_start = response.find('{')
 
         try:
-            # 尝试直接解析
-            parsed_result = json.loads(cleaned_response)
+            if json_start == -1:
+                # 没有找到JSON对象，移除markdown代码块标记后整体解析
+                parsed_result = json.loads(_CODE_FENCE_EDGES.sub('', response))
+            else:
+                parsed_result, _ = _JSON_DECODER.raw_decode(response, json_start)
             logger.info("✅ LLM响应解析成功")
             return parsed_result
 
         except json.JSONDecodeError as e:
             logger.error(f"❌ JSON解析失败: {e}")
             logger.error(f"📝 原始响应前100字符: {response[:100]}...")
-            logger.error(f"🧹 清理后响应前100字符: {cleaned_response[:100]}...")
+            logger.error(f"🧹 JSON起始位置后100字符: {response[max(json_start, 0):][:100]}...")
             return None
         except Exception as e:
             logger.error(f"❌ 响应解析失败: {e}")
             return None
 
-    def _clean_llm_response(self, response: str) -> str:
-        """清理LLM响应，提取JSON部分"""
-        if not response:
-            return ""
-
-        # 移除可能的前缀文本
-        response = response.strip()
-
-        # 移除markdown代码块标记
-        if response.startswith('```json'):
-            response = response[7:]
-        elif response.startswith('```'):
-            response = response[3:]
-
-        if response.endswith('```'):
-            response = response[:-3]
-
-        response = response.strip()
-
-        # 查找JSON开始位置
-        json_start = response.find('{')
-        if json_start == -1:
-            # 没有找到JSON，返回原始响应
-            return response
-
-        # 查找JSON结束位置
-        brace_count = 0
-        json_end = -1
-
-        for i in range(json_start, len(response)):
-            if response[i] == '{':
-                brace_count += 1
-            elif response[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    json_end = i + 1
-                    break
-
-        if json_end == -1:
-            # 没有找到完整的JSON，返回从开始位置到结尾
-            return response[json_start:]
-
-        # 返回提取的JSON部分
-        return response[json_start:json_end]
-
     def _extract_schema_info(self, file_path: str) -> Dict[str, Any]:
         """提取文件的schema信息（字段名、类型、样本值）"""
         try:
-            df = pd.read_excel(file_path)
+            df = _read_excel(file_path)
 
             schema_info = {
                 'file_name': os.path.basename(file_path),
@@ -547,20 +732,22 @@ class IntelligentDataImporter:
     def _convert_data_dict_to_markdown(self, file_path: str) -> str:
         """将数据字典文件转换为Markdown格式"""
         try:
-            df = pd.read_excel(file_path)
+            df = _read_excel(file_path)
 
-            markdown_content = f"# 数据字典: {os.path.basename(file_path)}\n\n"
+            lines = [f"# 数据字典: {os.path.basename(file_path)}\n"]
 
-            # 转换为表格格式
+            # 转换为表格格式（空值整体替换为空字符串，按行元组拼接，最后一次性合并）
             if len(df.columns) >= 2:
-                markdown_content += "| " + " | ".join(df.columns) + " |\n"
-                markdown_content += "| " + " | ".join(["---"] * len(df.columns)) + " |\n"
+                lines.append("| " + " | ".join(df.columns) + " |")
+                lines.append("| " + " | ".join(["---"] * len(df.columns)) + " |")
 
-                for _, row in df.iterrows():
-                    row_values = [str(v) if not pd.isna(v) else "" for v in row]
-                    markdown_content += "| " + " | ".join(row_values) + " |\n"
+                cells = df.astype(object).where(df.notna(), "")
+                lines.extend(
+                    "| " + " | ".join(map(str, row)) + " |"
+                    for row in cells.itertuples(index=False, name=None)
+                )
 
-            return markdown_content
+            return "\n".join(lines) + "\n"
 
         except Exception as e:
             logger.error(f"❌ 数据字典转换失败 {file_path}: {e}")
@@ -579,7 +766,7 @@ class IntelligentDataImporter:
 
                 try:
                     # 读取Excel文件
-                    df = pd.read_excel(file_path)
+                    df = _read_excel(file_path)
 
                     # 构建基础分析结果
                     basic_analysis = {
@@ -637,12 +824,13 @@ class IntelligentDataImporter:
         """生成表名"""
         # 移除扩展名和特殊字符
         name = file_name.replace('.xlsx', '').replace('.xls', '')
+        keywords = _find_business_keywords(name)
         # 简单的映射规则
-        if '合同' in name and '分类' in name:
+        if {'合同', '分类'} <= keywords:
             return 'contract_classification'
-        elif '贷款' in name and '合同' in name:
+        elif {'贷款', '合同'} <= keywords:
             return 'loan_contract_info'
-        elif '存款' in name and '余额' in name:
+        elif {'存款', '余额'} <= keywords:
             return 'deposit_balance'
         else:
             # 默认使用文件名的拼音或简化版本
@@ -667,16 +855,11 @@ class IntelligentDataImporter:
 
     def _guess_business_meaning(self, field_name: str) -> str:
         """猜测业务含义"""
-        if '客户' in field_name:
-            return '客户相关信息'
-        elif '合同' in field_name:
-            return '合同相关信息'
-        elif '余额' in field_name:
-            return '金额余额'
-        elif '日期' in field_name:
-            return '日期时间'
-        else:
-            return '业务数据字段'
+        keywords = _find_business_keywords(field_name)
+        for keyword, meaning in _FIELD_MEANINGS:
+            if keyword in keywords:
+                return meaning
+        return '业务数据字段'
 
     def _is_likely_primary_key(self, field_name: str, data) -> bool:
         """判断是否可能是主键"""
@@ -684,7 +867,7 @@ class IntelligentDataImporter:
             return False
         # 如果字段名包含ID或唯一值比例很高
         if 'id' in field_name.lower() or '号' in field_name:
-            unique_ratio = len(data.unique()) / len(data)
+            unique_ratio = data.nunique(dropna=False) / len(data)
             return unique_ratio > 0.9
         return False
 
@@ -1177,7 +1360,7 @@ class IntelligentDataImporter:
             if source_file_path.endswith('.csv'):
                 df = pd.read_csv(source_file_path)
             else:
-                df = pd.read_excel(source_file_path)
+                df = _read_excel(source_file_path)
 
             # 构建数据映射提示词
             mapping_prompt = self._build_data_mapping_prompt(table_config, df)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+测试公共fixture
+"""
+
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    """包含loans表的临时SQLite数据库（amount列含NULL）"""
+    database_path = tmp_path / "sample.db"
+    conn = sqlite3.connect(database_path)
+    conn.execute("CREATE TABLE loans (id INTEGER PRIMARY KEY, branch TEXT, amount INTEGER)")
+    conn.executemany(
+        "INSERT INTO loans (branch, amount) VALUES (?, ?)",
+        [("北京分行", 10), ("上海分行", None), ("北京分行", 2 ** 60 + 1)]
+    )
+    conn.commit()
+    conn.close()
+    return str(database_path)
+
+
+@pytest.fixture
+def engine(sample_db, monkeypatch):
+    """不连接LLM的CoreDataEngine（由各测试替换_generate_sql）"""
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    from core_modules.core_engine import CoreDataEngine
+    core_engine = CoreDataEngine(sample_db)
+    yield core_engine
+    core_engine._conn.close()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+配置模块缓存失效测试（文件mtime/大小变化后重新读取）
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from core_modules.config import unified_config
+from core_modules.config.database_config_manager import DatabaseConfigManager
+from core_modules.config.unified_config import UnifiedConfig
+
+
+def _add_table(database_path, table_name):
+    with sqlite3.connect(database_path) as conn:
+        conn.execute(f"CREATE TABLE {table_name} (id INTEGER)")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """以临时目录作为工作目录（配置与缓存目录都是相对路径）"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _unified_config(database_path):
+    """创建指向指定数据库的UnifiedConfig（先完成延迟加载，再设置数据库路径）"""
+    config = UnifiedConfig()
+    assert config.database_path is None
+    config.database_path = database_path
+    return config
+
+
+def test_database_info_refreshes_when_file_changes(workdir, sample_db):
+    """DatabaseInfo按数据库文件mtime和大小缓存，文件变化后重新读取表清单"""
+    manager = DatabaseConfigManager()
+    try:
+        info = manager._get_database_info(sample_db)
+        assert info.tables == ('loans',)
+        assert manager._get_database_info(sample_db) is info
+
+        _add_table(sample_db, 'deposits')
+
+        assert set(manager._get_database_info(sample_db).tables) == {'loans', 'deposits'}
+    finally:
+        manager.close()
+
+
+def test_database_info_disk_cache_is_immutable(workdir, sample_db):
+    """从磁盘元数据缓存读回的DatabaseInfo同样不可修改"""
+    first = DatabaseConfigManager()
+    first._get_database_info(sample_db)
+    first.close()
+
+    second = DatabaseConfigManager()
+    try:
+        info = second._get_database_info(sample_db)
+        assert info.tables == ('loans',)
+        with pytest.raises(AttributeError):
+            info.tables = ()
+    finally:
+        second.close()
+
+
+def test_sqlite_schema_cache_refreshes_when_file_changes(workdir, sample_db):
+    """Schema磁盘缓存按数据库文件mtime和大小失效"""
+    config = _unified_config(sample_db)
+    try:
+        assert 'loans' in config._extract_sqlite_schema()
+        assert os.listdir(workdir / unified_config._SCHEMA_CACHE_DIR)
+
+        _add_table(sample_db, 'deposits')
+
+        schema_info = config._extract_sqlite_schema()
+        assert {'loans', 'deposits'} <= set(schema_info)
+    finally:
+        config.close()
+
+
+def test_context_config_reloaded_when_file_changes(workdir):
+    """数据库上下文配置按文件mtime和大小缓存解析结果"""
+    config_path = str(workdir / "sample_context.json")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'business_terms': {'不良贷款': 'CL_RESULT IN (2, 3, 4)'}}, f, ensure_ascii=False)
+
+    data = unified_config._load_context_config(config_path)
+    assert unified_config._load_context_config(config_path) is data
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'business_terms': {}}, f)
+    st = os.stat(config_path)
+    os.utime(config_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert unified_config._load_context_config(config_path) == {'business_terms': {}}
+
+
+def test_database_discovery_sees_nested_files(workdir, monkeypatch):
+    """嵌套子目录中新增或删除数据库文件后重新发现"""
+    monkeypatch.setattr(unified_config, '_discovery_cache', None)
+    nested = workdir / "databases" / "imported" / "2024"
+    nested.mkdir(parents=True)
+
+    assert unified_config._discover_database_file() is None
+
+    db_file = nested / "bank.db"
+    db_file.touch()
+    found = unified_config._discover_database_file()
+    assert found is not None and os.path.samefile(found, db_file)
+
+    db_file.unlink()
+    assert unified_config._discover_database_file() is None
+
+
+def test_failed_schema_load_is_retried(workdir, sample_db, monkeypatch):
+    """Schema加载失败时不记录来源键，下次调用重新加载"""
+    config = _unified_config(sample_db)
+    monkeypatch.setattr(unified_config, '_ctx_mgr', lambda: (_ for _ in ()).throw(ImportError()))
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    try:
+        config._extract_sqlite_schema = fail
+        config._load_schema_info()
+        assert config.schema_info == {}
+
+        del config._extract_sqlite_schema
+        config._load_schema_info()
+        assert 'loans' in config.schema_info
+    finally:
+        config.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+CoreDataEngine 测试
+"""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from core_modules import core_engine
+
+
+def test_async_mode_result_is_json_serializable(engine):
+    """async模式返回的结果可直接JSON序列化，分析结果通过回调返回"""
+    engine._generate_sql = lambda query: "SELECT branch, amount FROM loans ORDER BY id"
+    done = threading.Event()
+    analysis = {}
+
+    def on_analysis(results):
+        analysis.update(results)
+        done.set()
+
+    result = engine.query("各分行贷款金额", "async", on_analysis=on_analysis)
+
+    assert result['success']
+    payload = json.loads(json.dumps(result, ensure_ascii=False))
+    assert payload['data'] == result['data']
+    assert done.wait(10)
+    assert analysis['statistics']['total_records'] == 3
+    assert 'visualization' in analysis
+
+
+@pytest.mark.parametrize("mode", ["auto", "simple", "detailed", "async"])
+def test_query_result_passes_flask_jsonify(engine, mode):
+    """各分析模式的结果都能经Flask的JSON响应返回"""
+    flask = pytest.importorskip("flask")
+    engine._generate_sql = lambda query: "SELECT branch, amount FROM loans ORDER BY id"
+
+    result = engine.query("各分行贷款金额", mode)
+
+    with flask.Flask(__name__).app_context():
+        response = flask.jsonify(result)
+    assert response.get_json()['data'] == result['data']
+
+
+def test_large_result_samples_visualization_only(engine):
+    """大结果集的可视化数据表为抽样记录，统计和洞察仍按全量精确计算"""
+    conn = sqlite3.connect(engine.database_path)
+    conn.execute("CREATE TABLE big (v INTEGER)")
+    conn.executemany("INSERT INTO big (v) VALUES (?)", ((i,) for i in range(60_000)))
+    conn.commit()
+    conn.close()
+    engine._generate_sql = lambda query: "SELECT v FROM big"
+
+    result = engine.query("全部数值", "auto")
+
+    main_table = result['visualization']['data_tables']['main']
+    assert main_table['sampled'] is True
+    assert len(main_table['data']) == core_engine._VIZ_SAMPLE_SIZE
+    assert main_table['record_count'] == 60_000
+    assert len(result['data']) == 60_000
+    summary = result['statistics']['numeric_summary']['v']
+    assert (summary['min'], summary['max'], summary['count']) == (0, 59_999, 60_000)
+    assert 'approximate' not in result['statistics']
+
+
+_DML_STATEMENTS = [
+    "DELETE FROM loans",
+    "UPDATE loans SET amount = 0",
+    "INSERT INTO loans (branch, amount) VALUES ('广州分行', 1)",
+    "DROP TABLE loans",
+    "CREATE TABLE t (x INTEGER)",
+]
+
+
+@pytest.mark.parametrize("sqlglot_available", [True, False])
+@pytest.mark.parametrize("sql", _DML_STATEMENTS)
+def test_normalize_read_only_sql_rejects_dml(engine, monkeypatch, sql, sqlglot_available):
+    """修改语句不是只读查询（有无sqlglot均拒绝）"""
+    if sqlglot_available and not core_engine.SQLGLOT_AVAILABLE:
+        pytest.skip("sqlglot未安装")
+    monkeypatch.setattr(core_engine, 'SQLGLOT_AVAILABLE', sqlglot_available)
+
+    assert engine._normalize_read_only_sql(sql) is None
+
+
+@pytest.mark.parametrize("sqlglot_available", [True, False])
+def test_normalize_read_only_sql_accepts_queries(engine, monkeypatch, sqlglot_available):
+    if sqlglot_available and not core_engine.SQLGLOT_AVAILABLE:
+        pytest.skip("sqlglot未安装")
+    monkeypatch.setattr(core_engine, 'SQLGLOT_AVAILABLE', sqlglot_available)
+
+    assert engine._normalize_read_only_sql("SELECT branch FROM loans") is not None
+    assert engine._normalize_read_only_sql("WITH b AS (SELECT branch FROM loans) SELECT * FROM b") is not None
+
+
+def test_query_rejects_dml_and_keeps_rows(engine, sample_db):
+    """LLM生成修改语句时query()返回错误且不执行"""
+    engine._generate_sql = lambda query: "DELETE FROM loans"
+
+    result = engine.query("清空贷款表", "auto")
+
+    assert result['success'] is False
+    with sqlite3.connect(sample_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM loans").fetchone()[0] == 3
+
+
+def test_connection_is_query_only(engine):
+    """引擎连接禁止写入（只读校验之外的兜底）"""
+    with pytest.raises(sqlite3.OperationalError):
+        engine._conn.execute("DELETE FROM loans")
+
+
+def test_records_keep_integer_values(engine):
+    """返回的记录保留整数精度和NULL，不受分析用DataFrame的浮点转换影响"""
+    engine._generate_sql = lambda query: "SELECT amount FROM loans ORDER BY id"
+
+    for _ in range(2):  # 第二次来自结果缓存
+        result = engine.query("贷款金额", "simple")
+        assert result['data'] == [{'amount': 10}, {'amount': None}, {'amount': 2 ** 60 + 1}]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+LLMInsightsGenerator 测试
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from core_modules.analytics.llm_insights_generator import LLMInsightsGenerator
+
+
+_LLM_RESPONSE = json.dumps({
+    "summary": "贷款集中在北京分行",
+    "key_insights": ["北京分行贷款金额最高"],
+    "recommendations": ["关注北京分行集中度风险"]
+}, ensure_ascii=False)
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """替换LLM调用的洞察生成器，记录每次发送的提示词"""
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    insights_generator = LLMInsightsGenerator()
+    insights_generator.llm_client = object()
+    insights_generator.sent_prompts = []
+    lock = threading.Lock()
+
+    def fake_call_llm(prompt):
+        with lock:
+            insights_generator.sent_prompts.append(prompt)
+        return _LLM_RESPONSE
+
+    monkeypatch.setattr(insights_generator, "_call_llm", fake_call_llm)
+    return insights_generator
+
+
+def _item(query):
+    return {'query': query, 'data_tables': {'main': [{'branch': '北京分行', 'amount': 10}]}}
+
+
+def test_batch_sends_duplicate_prompts_once(generator):
+    """同一批次内相同提示词只调用一次LLM，结果按原顺序返回"""
+    items = [_item("各分行贷款"), _item("各分行存款"), _item("各分行贷款")]
+
+    results = generator.generate_intelligent_insights_batch(items)
+
+    assert len(generator.sent_prompts) == 2
+    assert len(set(generator.sent_prompts)) == 2
+    assert len(results) == 3
+    assert results[0] == results[2]
+    assert results[0]['summary'] == "贷款集中在北京分行"
+
+
+def test_batch_works_inside_running_event_loop(generator):
+    """在已运行的事件循环中（如异步视图）调用批量生成不报错"""
+    async def run():
+        return generator.generate_intelligent_insights_batch([_item("各分行贷款")])
+
+    results = asyncio.run(run())
+
+    assert results[0]['key_insights'] == ["北京分行贷款金额最高"]
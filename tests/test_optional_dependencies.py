@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+可选依赖缺失时的回退路径测试
+
+通过关闭模块中的*_AVAILABLE标记模拟依赖未安装；依赖已安装时同时与加速路径的结果比对。
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core_modules import core_engine
+from core_modules.analytics import llm_insights_generator
+from core_modules.config import unified_config
+from core_modules.data_import import intelligent_data_importer
+
+
+def _available_flags(module, flag):
+    """依赖已安装时同时测试加速路径和回退路径，否则只测试回退路径"""
+    return [False, True] if getattr(module, flag) else [False]
+
+
+# ---- orjson ----
+
+@pytest.mark.parametrize("orjson_available", _available_flags(unified_config, 'ORJSON_AVAILABLE'))
+def test_load_json_file_without_orjson(tmp_path, monkeypatch, orjson_available):
+    monkeypatch.setattr(unified_config, 'ORJSON_AVAILABLE', orjson_available)
+    # 超过mmap阈值的文件同样覆盖
+    data = {'business_terms': {f'术语{i}': 'x' * 64 for i in range(2000)}}
+    path = tmp_path / "context.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    assert unified_config._load_json_file(str(path)) == data
+
+
+@pytest.mark.parametrize("orjson_available", _available_flags(llm_insights_generator, 'ORJSON_AVAILABLE'))
+def test_insights_dumps_without_orjson(monkeypatch, orjson_available):
+    monkeypatch.setattr(llm_insights_generator, 'ORJSON_AVAILABLE', orjson_available)
+    data = {'main': [{'支行': '北京分行', 1: 2.5}]}
+
+    assert json.loads(llm_insights_generator._dumps(data)) == {'main': [{'支行': '北京分行', '1': 2.5}]}
+    assert json.loads(llm_insights_generator._dumps(data, indent=True)) == json.loads(llm_insights_generator._dumps(data))
+
+
+# ---- ahocorasick ----
+
+@pytest.mark.parametrize("ahocorasick_available", _available_flags(unified_config, 'AHOCORASICK_AVAILABLE'))
+def test_pattern_index_without_ahocorasick(monkeypatch, ahocorasick_available):
+    """重叠和互为前缀的模式在两种实现下匹配结果一致"""
+    monkeypatch.setattr(unified_config, 'AHOCORASICK_AVAILABLE', ahocorasick_available)
+    index = unified_config.PatternIndex({
+        '贷款': {'loan'},
+        '不良贷款': {'npl'},
+        '不良': {'bad'},
+        '对公': {'corp'},
+    })
+
+    assert index.match("统计对公不良贷款余额") == {'loan', 'npl', 'bad', 'corp'}
+    assert index.match("存款余额") == set()
+    assert unified_config.PatternIndex({}).match("贷款") == set()
+
+
+def test_business_keywords_without_ahocorasick(monkeypatch):
+    name = "对公客户贷款合同余额"
+    expected = {'客户', '贷款', '合同', '余额'}
+    assert intelligent_data_importer._find_business_keywords(name) == expected
+
+    monkeypatch.setattr(intelligent_data_importer, '_BUSINESS_KEYWORD_AUTOMATON', None)
+    assert intelligent_data_importer._find_business_keywords(name) == expected
+
+
+# ---- sentence-transformers ----
+
+def test_embedding_model_missing(monkeypatch):
+    monkeypatch.setattr(core_engine, 'SENTENCE_TRANSFORMERS_AVAILABLE', False)
+    core_engine._embed_query.cache_clear()
+
+    assert core_engine._get_embedding_model(core_engine._EMBEDDING_MODEL) is None
+    assert core_engine._embed_texts(["贷款余额"]) is None
+    assert core_engine._embed_query("贷款余额") is None
+    core_engine._embed_query.cache_clear()
+
+
+def test_schema_filter_without_embedding_model(engine, monkeypatch):
+    """向量模型不可用时不筛选表，提示词包含完整Schema"""
+    monkeypatch.setattr(core_engine, 'SENTENCE_TRANSFORMERS_AVAILABLE', False)
+    monkeypatch.setattr(engine, '_SCHEMA_FILTER_TOP_K', 0)
+    core_engine._embed_query.cache_clear()
+
+    assert engine._select_tables("各分行贷款金额") is None
+    assert "表 loans" in engine._build_sql_prompt("各分行贷款金额")
+    core_engine._embed_query.cache_clear()
+
+
+# ---- numba ----
+
+@pytest.mark.parametrize("numba_available", _available_flags(core_engine, 'NUMBA_AVAILABLE'))
+def test_aggregate_numeric_without_numba(engine, monkeypatch, numba_available):
+    """JIT内核与pandas汇总的结果一致（含NaN和全空列）"""
+    monkeypatch.setattr(core_engine, 'NUMBA_AVAILABLE', numba_available)
+    monkeypatch.setattr(core_engine, '_NUMBA_MIN_CELLS', 0)
+    df = pd.DataFrame({
+        'amount': [10.0, np.nan, 2.5, -4.0],
+        'count': [1, 2, 3, 4],
+        'empty': [np.nan] * 4,
+    })
+
+    result = engine._aggregate_numeric(df, df.columns, pd.Index([]))
+
+    expected = df.agg(['count', 'sum', 'mean', 'min', 'max'])
+    pd.testing.assert_frame_equal(result.astype(float), expected.astype(float), check_names=False)
+
+
+# ---- xxhash ----
+
+@pytest.mark.parametrize("xxhash_available", _available_flags(core_engine, 'XXHASH_AVAILABLE'))
+def test_fingerprint_without_xxhash(monkeypatch, xxhash_available):
+    monkeypatch.setattr(core_engine, 'XXHASH_AVAILABLE', xxhash_available)
+
+    fingerprint = core_engine._fingerprint("schema|SELECT 1")
+
+    assert fingerprint == core_engine._fingerprint("schema|SELECT 1")
+    assert fingerprint != core_engine._fingerprint("schema|SELECT 2")
+    assert len(fingerprint) == 32
+    if not xxhash_available:
+        assert fingerprint == hashlib.blake2b(b"schema|SELECT 1", digest_size=16).hexdigest()
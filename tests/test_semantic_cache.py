@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+SemanticCache 持久化与向量对齐测试
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from core_modules import core_engine
+from core_modules.core_engine import SemanticCache
+
+
+def _fake_embed_texts(texts, model_name=None):
+    """按是否含“贷款”生成二维归一化向量，模拟向量模型"""
+    return np.asarray([[1.0, 0.0] if '贷款' in text else [0.0, 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """以固定向量替换向量模型"""
+    monkeypatch.setattr(core_engine, 'SENTENCE_TRANSFORMERS_AVAILABLE', True)
+    monkeypatch.setattr(core_engine, '_embed_texts', _fake_embed_texts)
+    monkeypatch.setattr(core_engine, '_embed_query', lambda text, model_name=None: _fake_embed_texts([text])[0])
+
+
+@pytest.fixture
+def no_model(monkeypatch):
+    """模拟向量模型不可用（未安装或加载失败）"""
+    monkeypatch.setattr(core_engine, '_embed_texts', lambda texts, model_name=None: None)
+    monkeypatch.setattr(core_engine, '_embed_query', lambda text, model_name=None: None)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "sample.db.semantic_cache.json")
+
+
+def test_exact_match_round_trip(cache_path, no_model):
+    """无向量模型时按规范化文本精确命中，重新加载后仍可命中"""
+    cache = SemanticCache(cache_path, "schema-1")
+    cache.put("查询 贷款余额", "SELECT 1")
+
+    reloaded = SemanticCache(cache_path, "schema-1")
+
+    assert reloaded.lookup("查询贷款余额") == "SELECT 1"
+    assert reloaded.lookup("查询存款余额") is None
+
+
+def test_schema_change_discards_entries(cache_path, no_model):
+    """Schema哈希变化后不加载旧条目"""
+    SemanticCache(cache_path, "schema-1").put("查询贷款余额", "SELECT 1")
+
+    assert SemanticCache(cache_path, "schema-2").lookup("查询贷款余额") is None
+
+
+def test_vectors_round_trip(cache_path, fake_model):
+    """向量随条目持久化，重新加载后按相似度命中"""
+    SemanticCache(cache_path, "schema-1").put("统计贷款总额", "SELECT SUM(amount) FROM loans")
+
+    with open(cache_path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['model'] == core_engine._EMBEDDING_MODEL
+    assert len(data['entries'][0]['vector']) == 2
+
+    reloaded = SemanticCache(cache_path, "schema-1")
+    assert reloaded.lookup("各分行贷款合计") == "SELECT SUM(amount) FROM loans"
+    assert reloaded.lookup("客户数量") is None
+
+
+def test_model_failure_keeps_vectors_aligned(cache_path, fake_model, monkeypatch):
+    """向量从磁盘加载后模型不可用时，新条目不会使向量与条目错位"""
+    cache = SemanticCache(cache_path, "schema-1")
+    cache.put("统计贷款总额", "SELECT 1")
+    cache.put("客户数量", "SELECT 2")
+
+    reloaded = SemanticCache(cache_path, "schema-1")
+    monkeypatch.setattr(core_engine, '_embed_texts', lambda texts, model_name=None: None)
+    monkeypatch.setattr(core_engine, '_embed_query', lambda text, model_name=None: None)
+    reloaded.put("存款余额", "SELECT 3")
+
+    assert reloaded._vectors is None
+    assert reloaded.lookup("存款余额") == "SELECT 3"
+    with open(cache_path, encoding='utf-8') as f:
+        assert json.load(f)['model'] is None
+
+    # 模型恢复后为全部条目重新计算向量
+    monkeypatch.setattr(core_engine, '_embed_texts', _fake_embed_texts)
+    monkeypatch.setattr(core_engine, '_embed_query', lambda text, model_name=None: _fake_embed_texts([text])[0])
+    reloaded.put("贷款笔数", "SELECT 4")
+
+    assert len(reloaded._vectors) == len(reloaded._entries) == 4
+
+
+def test_eviction_keeps_vectors_aligned(cache_path, fake_model):
+    """超出容量淘汰最早条目时向量同步淘汰"""
+    cache = SemanticCache(cache_path, "schema-1", max_entries=2)
+    cache.put("统计贷款总额", "SELECT 1")
+    cache.put("客户数量", "SELECT 2")
+    cache.put("贷款笔数", "SELECT 3")
+
+    assert [entry['sql'] for entry in cache._entries] == ["SELECT 2", "SELECT 3"]
+    assert len(cache._vectors) == 2
+    assert cache.lookup("统计贷款总额") == "SELECT 3"